@@ -2,3 +2,9 @@ from fastapi import Request
 
 def get_agent(request: Request):
     return request.app.state.agent
+
+def get_job_manager(request: Request):
+    return request.app.state.jobs
+
+def get_result_cache(request: Request):
+    return request.app.state.cache
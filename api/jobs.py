@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class OCRJob:
+    id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    future: Optional[Future] = None
+
+
+class JobManager:
+    
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, ttl_seconds: float = 3600):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.ttl_seconds = ttl_seconds
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-job")
+        self._jobs: Dict[str, OCRJob] = {}
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._running = 0
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'JobManager':
+        return cls(
+            max_workers=config.get('max_workers', 2),
+            max_queue=config.get('max_queue', 8),
+            ttl_seconds=config.get('ttl_seconds', 3600)
+        )
+    
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return self._outstanding - self._running
+    
+    @property
+    def running(self) -> int:
+        with self._lock:
+            return self._running
+    
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> OCRJob:
+        with self._lock:
+            self._prune()
+            self._reserve()
+            job = OCRJob(id=uuid.uuid4().hex)
+            self._jobs[job.id] = job
+        
+        job.future = self._executor.submit(self._run, job, fn, *args, **kwargs)
+        return job
+    
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        # For callers that wait on the result themselves; nothing is kept for polling
+        with self._lock:
+            self._reserve()
+        return self._executor.submit(self._execute, fn, *args, **kwargs)
+    
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+    
+    def _reserve(self) -> None:
+        if self._outstanding >= self.max_workers + self.max_queue:
+            raise QueueFullError(
+                f"OCR queue is full ({self._outstanding} jobs outstanding)"
+            )
+        self._outstanding += 1
+    
+    def _execute(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._outstanding -= 1
+    
+    def _run(self, job: OCRJob, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = self._execute(fn, *args, **kwargs)
+            job.status = "succeeded"
+            return job.result
+        except Exception as e:
+            logger.error(f"OCR job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = time.time()
+    
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from core.metrics import export, CONTENT_TYPE_LATEST
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+async def metrics():
+    return Response(content=export(), media_type=CONTENT_TYPE_LATEST)
@@ -1,63 +1,286 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from api.deps import get_agent
-from api.schemas import OCRResponse
+from fastapi.responses import StreamingResponse
+from api.deps import get_agent, get_job_manager, get_result_cache
+from api.jobs import JobManager, OCRJob, QueueFullError
+from api.schemas import OCRResponse, JobResponse, BatchResponse, BatchItemResponse
 from core.agent import Agent
-from typing import Optional
-import tempfile
-import os
+from modules.ocr.cache import ResultCache
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
+import asyncio
+import io
+import json
+import zipfile
 
 router = APIRouter(tags=["ocr"])
 
-@router.post("/ocr", response_model=OCRResponse)
-async def ocr_endpoint(
-    file: UploadFile = File(...),
-    mode: str = "fast",
-    agent: Agent = Depends(get_agent)
-):
+RETRY_AFTER_SECONDS = 5
+
+
+def _build_processor(agent: Agent, cache: Optional[ResultCache] = None):
+    from modules.ocr.processor import OCRProcessor
+    
+    ocr_engines = {}
+    # The active engine is loaded on demand; optional engines warm in the background
+    agent.get_active_plugin('ocr')
+    agent.warm_pending('ocr')
+    for name, plugin in agent.registry.list_category('ocr').items():
+        if agent.health.is_healthy('ocr', name):
+            ocr_engines[name] = plugin
+    
+    if not ocr_engines:
+        raise HTTPException(status_code=503, detail="No OCR engines available")
+    
+    llm_provider = agent.get_active_plugin('llm')
+    
+    return OCRProcessor(
+        ocr_engines,
+        llm_provider,
+        cache=cache,
+        config=agent.config.get_section('processing')
+    )
+
+
+def _to_response(result) -> OCRResponse:
+    return OCRResponse(
+        success=True,
+        engine=result.metadata.get('engine', 'unknown'),
+        text=result.text,
+        confidence=result.confidence,
+        metadata=result.metadata
+    )
+
+
+def run_ocr(agent: Agent, content: bytes, mode: str,
+            cache: Optional[ResultCache] = None, use_cache: bool = True,
+            on_event=None) -> OCRResponse:
+    processor = _build_processor(agent, cache)
+    
+    process = {
+        'fast': processor.process_fast,
+        'thinking': processor.process_thinking,
+        'auto': processor.process_auto
+    }[mode]
+    result = process(content, use_cache=use_cache, on_event=on_event)
+    
+    return _to_response(result)
+
+
+def run_ocr_batch(agent: Agent, items: List[Tuple[str, bytes]], mode: str,
+                  cache: Optional[ResultCache] = None, use_cache: bool = True) -> BatchResponse:
+    processor = _build_processor(agent, cache)
+    outcomes = processor.process_batch([content for _, content in items], mode=mode, use_cache=use_cache)
+    
+    results = []
+    for (filename, _), (result, error) in zip(items, outcomes):
+        results.append(BatchItemResponse(
+            filename=filename,
+            success=result is not None,
+            result=_to_response(result) if result is not None else None,
+            error=error
+        ))
+    
+    succeeded = sum(1 for item in results if item.success)
+    return BatchResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in ['fast', 'thinking', 'auto']:
+        raise HTTPException(status_code=400, detail="Mode must be 'fast', 'thinking' or 'auto'")
+
+
+async def _read_upload(file: UploadFile, mode: str) -> bytes:
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
     
-    if mode not in ['fast', 'thinking']:
-        raise HTTPException(status_code=400, detail="Mode must be 'fast' or 'thinking'")
+    _check_mode(mode)
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp:
+    return await file.read()
+
+
+async def _read_batch_uploads(files: List[UploadFile], max_files: int, max_file_bytes: int,
+                              max_total_bytes: int) -> List[Tuple[str, bytes]]:
+    items = []
+    total_bytes = 0
+    for file in files:
         content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
-    
-    try:
-        from modules.ocr.processor import OCRProcessor
-        
-        ocr_engines = {}
-        for name, plugin in agent.registry.list_category('ocr').items():
-            if plugin.health_check():
-                ocr_engines[name] = plugin
         
-        if not ocr_engines:
-            raise HTTPException(status_code=503, detail="No OCR engines available")
-        
-        llm_provider = agent.get_active_plugin('llm')
-        
-        processor = OCRProcessor(ocr_engines, llm_provider)
-        
-        if mode == 'fast':
-            result = processor.process_fast(tmp_path)
+        if zipfile.is_zipfile(io.BytesIO(content)):
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                # Limits are checked against the declared sizes before anything is decompressed;
+                # reads never return more than an entry declares
+                entries = [
+                    entry for entry in archive.infolist()
+                    if not (entry.is_dir() or entry.filename.startswith('__MACOSX/') or
+                            Path(entry.filename).name.startswith('.'))
+                ]
+                if len(items) + len(entries) > max_files:
+                    raise HTTPException(status_code=413, detail=f"Batch exceeds {max_files} files")
+                for entry in entries:
+                    if entry.file_size > max_file_bytes:
+                        raise HTTPException(status_code=413, detail=f"{entry.filename} exceeds {max_file_bytes} bytes")
+                    total_bytes += entry.file_size
+                    if total_bytes > max_total_bytes:
+                        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_total_bytes} bytes")
+                
+                for entry in entries:
+                    items.append((f"{file.filename}/{entry.filename}", archive.read(entry)))
         else:
-            result = processor.process_thinking(tmp_path)
+            if len(content) > max_file_bytes:
+                raise HTTPException(status_code=413, detail=f"{file.filename} exceeds {max_file_bytes} bytes")
+            total_bytes += len(content)
+            if total_bytes > max_total_bytes:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds {max_total_bytes} bytes")
+            items.append((file.filename, content))
         
-        return OCRResponse(
-            success=True,
-            engine=result.metadata.get('engine', 'unknown'),
-            text=result.text,
-            confidence=result.confidence,
-            metadata=result.metadata
+        if len(items) > max_files:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {max_files} files")
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    
+    return items
+
+
+def _submit(submit: Callable[..., Any], fn, *args, **kwargs) -> Any:
+    try:
+        return submit(fn, *args, **kwargs)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
         )
+
+
+def _job_response(job: OCRJob) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+
+@router.post("/ocr", response_model=OCRResponse)
+async def ocr_endpoint(
+    file: UploadFile = File(...),
+    mode: str = "fast",
+    no_cache: bool = False,
+    agent: Agent = Depends(get_agent),
+    jobs: JobManager = Depends(get_job_manager),
+    cache: Optional[ResultCache] = Depends(get_result_cache)
+):
+    content = await _read_upload(file, mode)
+    future = _submit(jobs.run, run_ocr, agent, content, mode, cache, not no_cache)
+    
+    try:
+        return await asyncio.wrap_future(future)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except PermissionError:
-                pass
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_events(future: Future, queue: asyncio.Queue) -> AsyncIterator[str]:
+    future = asyncio.wrap_future(future)
+    
+    while not future.done():
+        getter = asyncio.ensure_future(queue.get())
+        done, _ = await asyncio.wait({getter, future}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield _sse(*getter.result())
+        else:
+            getter.cancel()
+    
+    while not queue.empty():
+        yield _sse(*queue.get_nowait())
+    
+    try:
+        result = future.result()
+        yield _sse('result', result.model_dump())
+    except HTTPException as e:
+        yield _sse('error', {'status_code': e.status_code, 'detail': e.detail})
+    except Exception as e:
+        yield _sse('error', {'status_code': 500, 'detail': str(e)})
+
+
+@router.post("/ocr/stream")
+async def ocr_stream_endpoint(
+    file: UploadFile = File(...),
+    mode: str = "fast",
+    no_cache: bool = False,
+    agent: Agent = Depends(get_agent),
+    jobs: JobManager = Depends(get_job_manager),
+    cache: Optional[ResultCache] = Depends(get_result_cache)
+):
+    content = await _read_upload(file, mode)
+    
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+    
+    future = _submit(jobs.run, run_ocr, agent, content, mode, cache, not no_cache, on_event=on_event)
+    
+    return StreamingResponse(
+        _stream_events(future, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/ocr/jobs", response_model=JobResponse, status_code=202)
+async def submit_ocr_job(
+    file: UploadFile = File(...),
+    mode: str = "fast",
+    no_cache: bool = False,
+    agent: Agent = Depends(get_agent),
+    jobs: JobManager = Depends(get_job_manager),
+    cache: Optional[ResultCache] = Depends(get_result_cache)
+):
+    content = await _read_upload(file, mode)
+    job = _submit(jobs.submit, run_ocr, agent, content, mode, cache, not no_cache)
+    return _job_response(job)
+
+
+@router.post("/ocr/batch", response_model=JobResponse, status_code=202)
+async def submit_ocr_batch(
+    files: List[UploadFile] = File(...),
+    mode: str = "fast",
+    no_cache: bool = False,
+    agent: Agent = Depends(get_agent),
+    jobs: JobManager = Depends(get_job_manager),
+    cache: Optional[ResultCache] = Depends(get_result_cache)
+):
+    _check_mode(mode)
+    items = await _read_batch_uploads(
+        files,
+        agent.config.get('batch.max_files', 5000),
+        int(agent.config.get('batch.max_file_mb', 50) * 1024 * 1024),
+        int(agent.config.get('batch.max_total_mb', 1024) * 1024 * 1024)
+    )
+    job = _submit(jobs.submit, run_ocr_batch, agent, items, mode, cache, not no_cache)
+    return _job_response(job)
+
+
+@router.get("/ocr/jobs/{job_id}", response_model=JobResponse)
+async def get_ocr_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _job_response(job)
@@ -1,33 +1,56 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from api.deps import get_agent
 from core.agent import Agent
+from modules.common.residency import get_residency
+import asyncio
 
 router = APIRouter(tags=["system"])
 
 @router.get("/health")
 async def health_check(agent: Agent = Depends(get_agent)):
-    plugin_status = {}
-    for category in agent.registry._services:
-        plugin = agent.registry._services[category]
-        plugin_status[category] = plugin.health_check()
+    snapshot = agent.health.snapshot()
+    plugin_status = {key: status.healthy for key, status in snapshot.items()}
+    
+    if not agent.is_ready():
+        status = "starting"
+    else:
+        status = "healthy" if all(plugin_status.values()) else "degraded"
     
     return {
-        "status": "healthy" if all(plugin_status.values()) else "degraded",
+        "status": status,
+        "ready": agent.is_ready(),
+        "startup": agent.readiness(),
         "plugins": plugin_status,
+        "checks": {
+            key: {
+                "checked_at": status.checked_at,
+                "latency_ms": status.latency_ms,
+                "error": status.error
+            }
+            for key, status in snapshot.items()
+        },
         "version": agent.config.get('agent.version', '0.1.0')
     }
 
+@router.get("/ready")
+async def readiness(agent: Agent = Depends(get_agent)):
+    ready = agent.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "plugins": agent.readiness()}
+    )
+
+@router.get("/models")
+async def loaded_models(refresh: bool = False):
+    residency = get_residency()
+    servers = await asyncio.to_thread(residency.refresh) if refresh else residency.snapshot()
+    return {"servers": servers}
+
 @router.get("/plugins/{category}")
 async def list_plugins(category: str, agent: Agent = Depends(get_agent)):
-    plugins = agent.registry.list_category(category)
     return {
         "category": category,
         "active": agent.config.get(f'plugins.{category}.active'),
-        "plugins": {
-            name: {
-                "version": p.version,
-                "healthy": p.health_check()
-            }
-            for name, p in plugins.items()
-        }
+        "plugins": agent.list_plugins(category)
     }
@@ -1,11 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Literal
+from typing import Dict, Any, List, Literal, Optional, Union
 
 
 class OCRRequest(BaseModel):
-    mode: Literal["fast", "thinking"] = Field(
+    mode: Literal["fast", "thinking", "auto"] = Field(
         default="fast", 
-        description="Processing mode: 'fast' for quick OCR, 'thinking' for detailed analysis"
+        description="Processing mode: 'fast' for quick OCR, 'thinking' for detailed analysis, 'auto' to choose per input"
     )
 
 
@@ -21,3 +21,27 @@ class HealthResponse(BaseModel):
     status: str
     plugins: Dict[str, bool]
     version: str
+
+
+class BatchItemResponse(BaseModel):
+    filename: str
+    success: bool
+    result: Optional[OCRResponse] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResponse]
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Union[OCRResponse, BatchResponse]] = None
+    error: Optional[str] = None
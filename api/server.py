@@ -2,7 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from core.agent import Agent
-from api.routes import ocr, system
+from api.jobs import JobManager
+from modules.ocr.cache import ResultCache
+from modules.common.scheduler import configure_scheduler, schedulers
+from modules.common.residency import configure_residency
+from modules.ocr.runlog import configure_run_log
+from api.routes import ocr, system, metrics as metrics_routes
+from core import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,15 +18,33 @@ def create_app(config_path: str = None) -> FastAPI:
         config_path = "config/config.yaml"
         
     agent = Agent(config_path)
+    configure_scheduler(agent.config.get_section('scheduler'))
+    residency = configure_residency(agent.config.get_section('residency'))
+    run_log = configure_run_log(agent.config.get_section('logging.ocr_runs'))
+    jobs = JobManager.from_config(agent.config.get_section('jobs'))
+    cache = ResultCache.from_config(agent.config.get_section('cache'))
+    
+    metrics.JOB_QUEUE_DEPTH.set_function(lambda: jobs.queued)
+    metrics.JOBS_RUNNING.set_function(lambda: jobs.running)
+    metrics.MODEL_CALLS_IN_FLIGHT.set_function(lambda: sum(s.in_flight for s in schedulers().values()))
+    metrics.MODEL_CALLS_WAITING.set_function(lambda: sum(s.waiting for s in schedulers().values()))
     
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         app.state.agent = agent
+        app.state.jobs = jobs
+        app.state.cache = cache
+        agent.health.start()
+        residency.start()
         logger.info("Agent initialized and plugins loaded")
         
         yield
         
         logger.info("Shutting down agent...")
+        jobs.shutdown()
+        agent.health.stop()
+        residency.stop()
+        run_log.close()
         for plugin in agent.registry._services.values():
             if hasattr(plugin, 'cleanup'):
                 plugin.cleanup()
@@ -41,5 +65,6 @@ def create_app(config_path: str = None) -> FastAPI:
     
     app.include_router(system.router, prefix="/api/v1")
     app.include_router(ocr.router, prefix="/api/v1")
+    app.include_router(metrics_routes.router)
     
     return app
@@ -0,0 +1,365 @@
+from benchmarks.stub_ollama import StubOllamaServer, DEFAULT_STUB_CONFIG
+from PIL import Image, ImageDraw
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import copy
+import io
+import json
+import logging
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import httpx
+import yaml
+
+logger = logging.getLogger(__name__)
+
+WORKLOADS = ('fast', 'thinking', 'batch')
+PERCENTILES = (50, 95, 99)
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {
+        f'p{p}': round(ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))], 4)
+        for p in PERCENTILES
+    }
+    summary['mean'] = round(sum(ordered) / len(ordered), 4)
+    summary['max'] = round(ordered[-1], 4)
+    return summary
+
+
+def make_image(index: int, base: Optional[Image.Image] = None) -> bytes:
+    # Every request gets distinct content so neither the cache nor coalescing kicks in
+    image = base.copy() if base is not None else Image.new('RGB', (1280, 960), 'white')
+    draw = ImageDraw.Draw(image)
+    if base is None:
+        for row in range(40):
+            draw.text((20, 20 + row * 22), f"Zone {row:02d}  Temp {40 + row * 0.1:.1f} C  Valve {row * 2}%", fill='black')
+    draw.text((image.width - 140, image.height - 30), f"bench #{index}", fill='red')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def set_dotted(config: Dict[str, Any], key: str, value: Any) -> None:
+    node = config
+    parts = key.split('.')
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+    node[parts[-1]] = value
+
+
+def build_config(base_path: str, stub_url: str, workdir: Path, max_workers: int, max_queue: int,
+                 with_marker: bool, overrides: List[str]) -> Tuple[Path, Dict[str, Any]]:
+    with open(base_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config = copy.deepcopy(config)
+    
+    engines = config['plugins']['ocr']['engines']
+    if not with_marker:
+        engines.pop('marker', None)
+    for category in ('ocr', 'llm'):
+        section = config['plugins'][category]
+        for plugin in section.get('engines', section.get('providers', {})).values():
+            plugin_config = plugin.setdefault('config', {})
+            plugin_config.pop('backends', None)
+            plugin_config['base_url'] = stub_url
+            if str(plugin_config.get('model', '')).startswith('${'):
+                plugin_config['model'] = 'stub-model'
+            # The stub answers every prompt alike, so a response cache would skip the calls being measured
+            if 'cache' in plugin_config:
+                plugin_config['cache'] = {**plugin_config['cache'], 'enabled': False}
+    
+    set_dotted(config, 'startup.mode', 'eager')
+    set_dotted(config, 'cache.enabled', False)
+    set_dotted(config, 'jobs.max_workers', max_workers)
+    set_dotted(config, 'jobs.max_queue', max_queue)
+    set_dotted(config, 'logging.level', 'WARNING')
+    set_dotted(config, 'logging.ocr_runs.directory', str(workdir / 'runs'))
+    
+    for override in overrides:
+        key, _, value = override.partition('=')
+        set_dotted(config, key, yaml.safe_load(value))
+    
+    path = workdir / 'config.yaml'
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f)
+    return path, config
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except Exception:
+        return {'commit': None, 'dirty': None}
+
+
+class APIServer:
+    
+    def __init__(self, config_path: Path):
+        import uvicorn
+        from api.server import create_app
+        
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(
+            create_app(str(config_path)), host='127.0.0.1', port=self.port, log_level='warning'
+        ))
+        self._thread = threading.Thread(target=self._server.run, name='bench-api', daemon=True)
+    
+    def start(self, timeout: float = 60.0) -> 'APIServer':
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.url}/api/v1/ready", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"API server did not become ready within {timeout}s")
+    
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+def _stage_seconds(metadata: Dict[str, Any]) -> Dict[str, float]:
+    stages = (metadata.get('metrics') or {}).get('stages') or {}
+    return {stage: values['seconds'] for stage, values in stages.items()}
+
+
+async def _single(client: httpx.AsyncClient, mode: str, content: bytes) -> Dict[str, Any]:
+    response = await client.post(
+        '/api/v1/ocr', params={'mode': mode, 'no_cache': 'true'},
+        files={'file': ('bench.png', content, 'image/png')}
+    )
+    if response.status_code != 200:
+        return {'ok': False, 'status': response.status_code, 'documents': 1, 'stages': []}
+    return {'ok': True, 'status': 200, 'documents': 1, 'stages': [_stage_seconds(response.json()['metadata'])]}
+
+
+async def _batch(client: httpx.AsyncClient, contents: List[bytes], poll_interval: float = 0.05) -> Dict[str, Any]:
+    response = await client.post(
+        '/api/v1/ocr/batch', params={'mode': 'fast', 'no_cache': 'true'},
+        files=[('files', (f'bench{i}.png', content, 'image/png')) for i, content in enumerate(contents)]
+    )
+    if response.status_code != 202:
+        return {'ok': False, 'status': response.status_code, 'documents': len(contents), 'stages': []}
+    
+    job_id = response.json()['job_id']
+    while True:
+        job = (await client.get(f'/api/v1/ocr/jobs/{job_id}')).json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        await asyncio.sleep(poll_interval)
+    
+    items = (job.get('result') or {}).get('results') or []
+    return {
+        'ok': job['status'] == 'succeeded' and all(item['success'] for item in items),
+        'status': 200,
+        'documents': len(contents),
+        'stages': [_stage_seconds(item['result']['metadata']) for item in items if item.get('result')]
+    }
+
+
+async def run_level(base_url: str, workload: str, concurrency: int, requests: int,
+                    batch_size: int, base_image: Optional[Image.Image], offset: int) -> Dict[str, Any]:
+    documents = batch_size if workload == 'batch' else 1
+    inputs = [make_image(offset + i, base_image) for i in range(requests * documents)]
+    records: List[Dict[str, Any]] = []
+    next_index = 0
+    
+    async def worker(client: httpx.AsyncClient):
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                if workload == 'batch':
+                    record = await _batch(client, inputs[index * documents:(index + 1) * documents])
+                else:
+                    record = await _single(client, workload, inputs[index])
+            except httpx.HTTPError as e:
+                record = {'ok': False, 'status': None, 'documents': documents, 'stages': [], 'error': str(e)}
+            record['latency'] = time.perf_counter() - start
+            records.append(record)
+    
+    timeout = httpx.Timeout(600.0, connect=10.0)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    
+    return summarize(records, wall)
+
+
+def summarize(records: List[Dict[str, Any]], wall: float) -> Dict[str, Any]:
+    succeeded = [record for record in records if record['ok']]
+    stage_values: Dict[str, List[float]] = {}
+    for record in succeeded:
+        for stages in record['stages']:
+            for stage, seconds in stages.items():
+                stage_values.setdefault(stage, []).append(seconds)
+    
+    return {
+        'requests': len(records),
+        'succeeded': len(succeeded),
+        'failed': len(records) - len(succeeded),
+        'rejected': sum(1 for record in records if record['status'] == 503),
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(succeeded) / wall, 3) if wall else 0.0,
+        'documents_per_second': round(sum(record['documents'] for record in succeeded) / wall, 3) if wall else 0.0,
+        'latency': percentiles([record['latency'] for record in succeeded]),
+        'stages': {stage: percentiles(values) for stage, values in sorted(stage_values.items())}
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    print(f"\ncommit {report['revision']['commit']}{' (dirty)' if report['revision']['dirty'] else ''}")
+    jobs = report['settings'].get('jobs')
+    if jobs:
+        print(f"jobs: {jobs['max_workers']} workers, queue {jobs['max_queue']}")
+    header = f"{'workload':<10}{'conc':>5}{'ok/req':>9}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δrps':>9}{'Δp95':>9}"
+    print(header)
+    
+    for key, result in report['results'].items():
+        workload, concurrency = key.split('@')
+        latency = result['latency']
+        line = (f"{workload:<10}{concurrency:>5}{result['succeeded']:>5}/{result['requests']:<3}"
+                f"{result['throughput_rps']:>9.2f}{latency.get('p50', 0):>9.3f}"
+                f"{latency.get('p95', 0):>9.3f}{latency.get('p99', 0):>9.3f}")
+        previous = (baseline or {}).get('results', {}).get(key)
+        if previous and previous['throughput_rps'] and previous['latency'].get('p95'):
+            line += f"{_delta(result['throughput_rps'], previous['throughput_rps']):>9}"
+            line += f"{_delta(latency.get('p95', 0), previous['latency']['p95']):>9}"
+        print(line)
+        
+        for stage, values in result['stages'].items():
+            print(f"  {stage:<20} p50 {values['p50']:.3f}  p95 {values['p95']:.3f}  p99 {values['p99']:.3f}")
+
+
+def _delta(current: float, previous: float) -> str:
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the OCR API against a stub Ollama server')
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=32, help='Requests per workload and concurrency level')
+    parser.add_argument('--batch-size', type=int, default=8, help='Documents per batch request')
+    parser.add_argument('--image', help='Base image for requests (a synthetic dashboard is used by default)')
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_STUB_CONFIG['latency_ms'])
+    parser.add_argument('--jitter-ms', type=float, default=DEFAULT_STUB_CONFIG['jitter_ms'])
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_STUB_CONFIG['error_rate'])
+    parser.add_argument('--tokens', type=int, default=DEFAULT_STUB_CONFIG['tokens'])
+    parser.add_argument('--token-interval-ms', type=float, default=DEFAULT_STUB_CONFIG['token_interval_ms'])
+    parser.add_argument('--load-ms', type=float, default=DEFAULT_STUB_CONFIG['load_ms'],
+                        help='Time the stub takes to load each model on first use')
+    parser.add_argument('--seed', type=int, default=DEFAULT_STUB_CONFIG['seed'])
+    parser.add_argument('--max-workers', type=int,
+                        help='jobs.max_workers for the API under test (default: the highest concurrency level)')
+    parser.add_argument('--max-queue', type=int, help='jobs.max_queue for the API under test (default: 4x max workers)')
+    parser.add_argument('--with-marker', action='store_true', help='Keep Marker enabled (loads its models)')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='Override a config value, e.g. --set scheduler.max_concurrent_calls=8')
+    parser.add_argument('--output', help='Where to write the JSON report (default: benchmarks/results/)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    workloads = [w for w in args.workloads.split(',') if w]
+    levels = [int(c) for c in args.concurrency.split(',') if c]
+    for workload in workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"Unknown workload: {workload}")
+    
+    stub_config = {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'tokens': args.tokens,
+        'token_interval_ms': args.token_interval_ms,
+        'load_ms': args.load_ms,
+        'seed': args.seed
+    }
+    base_image = Image.open(args.image).convert('RGB') if args.image else None
+    # The job pool is sized for the load being driven, not taken from config.yaml
+    max_workers = args.max_workers or max(levels)
+    max_queue = args.max_queue or max_workers * 4
+    
+    with tempfile.TemporaryDirectory(prefix='ocr-bench-') as workdir:
+        stub = StubOllamaServer(config=stub_config).start()
+        config_path, config = build_config(args.config, stub.url, Path(workdir), max_workers, max_queue,
+                                           args.with_marker, args.set)
+        api = APIServer(config_path).start()
+        
+        results = {}
+        offset = 0
+        try:
+            for workload in workloads:
+                for concurrency in levels:
+                    print(f"Running {workload} at concurrency {concurrency}...", flush=True)
+                    results[f"{workload}@{concurrency}"] = asyncio.run(run_level(
+                        api.url, workload, concurrency, args.requests, args.batch_size, base_image, offset
+                    ))
+                    offset += args.requests * args.batch_size
+        finally:
+            api.stop()
+            stub.stop()
+    
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'settings': {
+            'workloads': workloads,
+            'concurrency': levels,
+            'requests': args.requests,
+            'batch_size': args.batch_size,
+            'image': args.image,
+            'stub': stub_config,
+            'jobs': {key: config['jobs'][key] for key in ('max_workers', 'max_queue')},
+            'overrides': args.set
+        },
+        'stub_requests': stub.requests,
+        'stub_errors': stub.errors,
+        'results': results
+    }
+    
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['revision']['commit'] or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STUB_CONFIG = {
+    'latency_ms': 200.0,
+    'jitter_ms': 50.0,
+    'error_rate': 0.0,
+    'tokens': 64,
+    'token_interval_ms': 2.0,
+    'prompt_tokens': 512,
+    'load_ms': 0.0,
+    'seed': 0
+}
+
+STUB_TEXT = "Temperature 42.1 C | Valve 100 % | Pump ON | Status normal"
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at shutdown is expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class StubOllamaServer:
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: Optional[Dict[str, Any]] = None):
+        self.config = {**DEFAULT_STUB_CONFIG, **(config or {})}
+        self._random = random.Random(self.config['seed'])
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.loaded = set()
+        self._server = _QuietHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'StubOllamaServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-ollama', daemon=True)
+        self._thread.start()
+        logger.info(f"Stub Ollama listening on {self.url}")
+        return self
+    
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def _draw(self) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.config['error_rate']
+            if failed:
+                self.errors += 1
+            jitter = self._random.uniform(-self.config['jitter_ms'], self.config['jitter_ms'])
+        return {'failed': failed, 'delay': max(0.0, self.config['latency_ms'] + jitter) / 1000}
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self._send_json(200, {'models': []})
+                elif self.path == '/api/ps':
+                    with stub._lock:
+                        models = [{'name': name, 'model': name, 'size_vram': 0} for name in sorted(stub.loaded)]
+                    self._send_json(200, {'models': models})
+                else:
+                    self._send_json(404, {'error': 'not found'})
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                
+                if self.path not in ('/api/generate', '/api/chat'):
+                    self._send_json(404, {'error': 'not found'})
+                    return
+                
+                load_seconds = stub._load(payload.get('model'))
+                if 'prompt' not in payload and 'messages' not in payload:
+                    # A call without a prompt only loads the model
+                    self._send_json(200, {'model': payload.get('model'), 'response': '', 'done': True,
+                                          'load_duration': int(load_seconds * 1e9)})
+                    return
+                
+                draw = stub._draw()
+                draw['load_seconds'] = load_seconds
+                if draw['failed']:
+                    time.sleep(draw['delay'] / 2)
+                    self._send_json(500, {'error': 'stub failure'})
+                    return
+                
+                if payload.get('stream'):
+                    self._stream(payload, draw['delay'], load_seconds)
+                else:
+                    time.sleep(draw['delay'])
+                    self._send_json(200, stub._final(payload, STUB_TEXT, load_seconds))
+            
+            def _stream(self, payload: Dict[str, Any], delay: float, load_seconds: float) -> None:
+                tokens = max(1, stub.config['tokens'])
+                interval = stub.config['token_interval_ms'] / 1000
+                words = STUB_TEXT.split()
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                
+                # Time to first token is the configured latency; the rest is token pacing
+                time.sleep(max(0.0, delay - interval * tokens))
+                for index in range(tokens):
+                    self._chunk({'model': payload.get('model'), **stub._text(payload, words[index % len(words)] + ' '), 'done': False})
+                    time.sleep(interval)
+                self._chunk(stub._final(payload, '', load_seconds))
+                self.wfile.write(b'0\r\n\r\n')
+            
+            def _chunk(self, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode('utf-8') + b'\n'
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+        
+        return Handler
+    
+    def _load(self, model: Optional[str]) -> float:
+        # The first call for a model pays the configured load time, as a cold Ollama server would
+        with self._lock:
+            if model in self.loaded:
+                return 0.0
+            self.loaded.add(model)
+        load_seconds = self.config['load_ms'] / 1000
+        time.sleep(load_seconds)
+        return load_seconds
+    
+    @staticmethod
+    def _text(payload: Dict[str, Any], text: str) -> Dict[str, Any]:
+        # /api/chat answers with a message, /api/generate with a response string
+        if 'messages' in payload:
+            return {'message': {'role': 'assistant', 'content': text}}
+        return {'response': text}
+    
+    def _final(self, payload: Dict[str, Any], text: str, load_seconds: float = 0.0) -> Dict[str, Any]:
+        return {
+            'model': payload.get('model'),
+            **self._text(payload, text),
+            'done': True,
+            'load_duration': int(load_seconds * 1e9),
+            'prompt_eval_count': self.config['prompt_tokens'],
+            'eval_count': self.config['tokens']
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub Ollama server for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11500)
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_STUB_CONFIG['latency_ms'])
+    parser.add_argument('--jitter-ms', type=float, default=DEFAULT_STUB_CONFIG['jitter_ms'])
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_STUB_CONFIG['error_rate'])
+    parser.add_argument('--tokens', type=int, default=DEFAULT_STUB_CONFIG['tokens'])
+    parser.add_argument('--token-interval-ms', type=float, default=DEFAULT_STUB_CONFIG['token_interval_ms'])
+    parser.add_argument('--load-ms', type=float, default=DEFAULT_STUB_CONFIG['load_ms'])
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    server = StubOllamaServer(args.host, args.port, {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'tokens': args.tokens,
+        'token_interval_ms': args.token_interval_ms,
+        'load_ms': args.load_ms
+    }).start()
+    
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,5 +3,6 @@ from .plugin import IPlugin
 from .registry import ServiceRegistry
 from .config import ConfigManager
 from .loader import PluginLoader
+from .health import HealthMonitor
 
-__all__ = ['Agent', 'IPlugin', 'ServiceRegistry', 'ConfigManager', 'PluginLoader']
+__all__ = ['Agent', 'IPlugin', 'ServiceRegistry', 'ConfigManager', 'PluginLoader', 'HealthMonitor']
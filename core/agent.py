@@ -2,17 +2,22 @@ from typing import Any, Dict, Optional
 from .config import ConfigManager
 from .registry import ServiceRegistry
 from .loader import PluginLoader
+from .health import HealthMonitor
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
 class Agent:
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, startup_mode: Optional[str] = None):
         self.config = ConfigManager(config_path)
+        self.startup = self.config.get_section('startup')
+        self.startup_mode = startup_mode or self.startup.get('mode', 'eager')
         self.registry = ServiceRegistry()
         self.loader = PluginLoader(self.config, self.registry)
+        self.health = HealthMonitor.from_config(self.registry, self.config.get_section('health'))
         
         self._setup_logging()
         self._load_plugins()
@@ -25,9 +30,32 @@ class Agent:
         )
     
     def _load_plugins(self) -> None:
-        logger.info("Loading plugins...")
-        self.loader.load_all_plugins()
-        logger.info("All plugins loaded successfully")
+        logger.info(f"Loading plugins ({self.startup_mode})...")
+        start = time.perf_counter()
+        self.loader.load_all_plugins(
+            mode=self.startup_mode,
+            required=self.startup.get('required'),
+            workers=self.startup.get('workers', 4)
+        )
+        logger.info(f"Plugin startup ({self.startup_mode}) returned in {time.perf_counter() - start:.2f}s")
+    
+    def warm_pending(self, category: str) -> None:
+        # Lazily declared plugins start warming on first use without blocking the caller
+        self.loader.warm_up(self.registry.claim_pending(category), self.startup.get('workers', 4))
+    
+    def is_ready(self) -> bool:
+        return self.registry.ready()
+    
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            key: {
+                'status': state.status,
+                'required': state.required,
+                'load_seconds': state.load_seconds,
+                'error': state.error
+            }
+            for key, state in self.registry.states().items()
+        }
     
     def execute(self, category: str, task_type: str, **kwargs) -> Any:
         plugin = self.registry.get(category, task_type)
@@ -35,9 +63,13 @@ class Agent:
         if not plugin:
             raise ValueError(f"Plugin {category}.{task_type} not found")
         
-        if not plugin.health_check():
+        if not self.health.is_healthy(category, task_type):
             raise RuntimeError(f"Plugin {category}.{task_type} is not healthy")
         
+        # OCR engines used to take input_path; existing callers still pass it by that name
+        if category == 'ocr' and 'input_path' in kwargs and 'source' not in kwargs:
+            kwargs['source'] = kwargs.pop('input_path')
+        
         if hasattr(plugin, 'process'):
             return plugin.process(**kwargs)
         else:
@@ -51,13 +83,21 @@ class Agent:
     
     def list_plugins(self, category: str) -> Dict[str, Any]:
         plugins = self.registry.list_category(category)
-        return {
+        listing = {
             name: {
                 'version': plugin.version,
-                'healthy': plugin.health_check()
+                'status': 'ready',
+                'healthy': self.health.is_healthy(category, name)
             }
             for name, plugin in plugins.items()
         }
+        
+        for key, state in self.registry.states().items():
+            name = key.split('.', 1)[1]
+            if key.startswith(f"{category}.") and name not in listing:
+                listing[name] = {'version': None, 'status': state.status, 'healthy': False}
+        
+        return listing
     
     def health_check(self) -> Dict[str, bool]:
-        return self.registry.health_check_all()
+        return self.health.status()
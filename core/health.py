@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from .registry import ServiceRegistry
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HealthStatus:
+    healthy: bool
+    checked_at: float
+    latency_ms: float
+    error: Optional[str] = None
+
+
+class HealthMonitor:
+    
+    def __init__(self, registry: ServiceRegistry, interval_seconds: float = 15.0, ttl_seconds: float = 45.0):
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+        self.ttl_seconds = ttl_seconds
+        
+        self._status: Dict[str, HealthStatus] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health")
+    
+    @classmethod
+    def from_config(cls, registry: ServiceRegistry, config: Dict[str, Any]) -> 'HealthMonitor':
+        return cls(
+            registry,
+            interval_seconds=config.get('interval_seconds', 15.0),
+            ttl_seconds=config.get('ttl_seconds', 45.0)
+        )
+    
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Health monitor started (interval {self.interval_seconds}s)")
+    
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds)
+            self._thread = None
+        self._executor.shutdown(wait=False)
+    
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval_seconds)
+    
+    def probe_all(self) -> Dict[str, HealthStatus]:
+        keys = list(self.registry._services.keys())
+        list(self._executor.map(self.probe, keys))
+        return self.snapshot()
+    
+    def probe(self, key: str) -> HealthStatus:
+        plugin = self.registry._services.get(key)
+        start = time.time()
+        error = None
+        
+        try:
+            healthy = bool(plugin and plugin.health_check())
+        except Exception as e:
+            healthy = False
+            error = str(e)
+        
+        status = HealthStatus(
+            healthy=healthy,
+            checked_at=time.time(),
+            latency_ms=round((time.time() - start) * 1000, 1),
+            error=error
+        )
+        
+        with self._lock:
+            previous = self._status.get(key)
+            self._status[key] = status
+            self._refreshing.discard(key)
+        
+        if previous is None or previous.healthy != healthy:
+            logger.info(f"Plugin {key} is {'healthy' if healthy else 'unhealthy'}")
+        
+        return status
+    
+    def is_healthy(self, category: str, name: str) -> bool:
+        key = f"{category}.{name}"
+        
+        with self._lock:
+            status = self._status.get(key)
+            expired = status is not None and time.time() - status.checked_at > self.ttl_seconds
+            if expired and key not in self._refreshing:
+                self._refreshing.add(key)
+                self._executor.submit(self.probe, key)
+        
+        if status is None:
+            # Nothing probed yet (monitor not started, e.g. CLI runs)
+            status = self.probe(key)
+        
+        return status.healthy
+    
+    def status(self) -> Dict[str, bool]:
+        # For synchronous callers, which may wait for a first probe
+        with self._lock:
+            known = dict(self._status)
+        return {key: (known.get(key) or self.probe(key)).healthy for key in self.registry._services}
+    
+    def snapshot(self) -> Dict[str, HealthStatus]:
+        with self._lock:
+            known = dict(self._status)
+        
+        # Unprobed plugins are checked in the background so callers on the event loop never wait
+        for key in self.registry._services:
+            if key not in known:
+                with self._lock:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self.probe, key)
+                known[key] = HealthStatus(healthy=False, checked_at=0.0, latency_ms=0.0, error="not probed yet")
+        
+        return known
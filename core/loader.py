@@ -1,9 +1,12 @@
-from typing import Type, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Type, Dict, Any, Iterable, List, Optional
 from .config import ConfigManager
 from .registry import ServiceRegistry
 from .plugin import IPlugin
 import importlib
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +17,59 @@ class PluginLoader:
         self.config = config
         self.registry = registry
     
-    def load_all_plugins(self) -> None:
+    def load_all_plugins(self, mode: str = 'eager', required: Optional[Iterable[str]] = None,
+                         workers: int = 4) -> None:
+        required = set(required if required is not None else self.default_required())
+        keys = self.declare_all_plugins(required)
+        
+        if mode == 'eager':
+            for key in keys:
+                self._warm(key)
+        elif mode == 'background':
+            self.warm_up(keys, workers)
+        elif mode != 'lazy':
+            raise ValueError(f"Unknown plugin startup mode: {mode}")
+    
+    def default_required(self) -> Iterable[str]:
+        plugins_config = self.config.get('plugins', {})
+        return [
+            f"{category}.{category_config['active']}"
+            for category, category_config in plugins_config.items()
+            if isinstance(category_config, dict) and category_config.get('active')
+        ]
+    
+    def warm_up(self, keys: Iterable[str], workers: int = 4) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        
+        start = time.perf_counter()
+        remaining = [len(keys)]
+        lock = threading.Lock()
+        
+        def warm(key: str) -> None:
+            self._warm(key)
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                logger.info(f"Plugin warm-up finished in {time.perf_counter() - start:.2f}s")
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys))), thread_name_prefix="plugin-init")
+        for key in keys:
+            executor.submit(warm, key)
+        executor.shutdown(wait=False)
+    
+    def _warm(self, key: str) -> None:
+        try:
+            self.registry.load(key)
+        except Exception as e:
+            logger.error(f"Failed to load plugin {key}: {str(e)}")
+    
+    def declare_all_plugins(self, required: Iterable[str] = ()) -> List[str]:
+        required = set(required)
         plugins_config = self.config.get('plugins', {})
+        keys = []
         
         for category, category_config in plugins_config.items():
             if not isinstance(category_config, dict):
@@ -27,20 +81,22 @@ class PluginLoader:
                 if not isinstance(engine_config, dict):
                     continue
                 
-                self._load_plugin(category, name, engine_config)
+                key = f"{category}.{name}"
+                if self._declare_plugin(category, name, engine_config, key in required):
+                    keys.append(key)
+        
+        return keys
     
-    def _load_plugin(self, category: str, name: str, engine_config: Dict[str, Any]) -> None:
+    def _declare_plugin(self, category: str, name: str, engine_config: Dict[str, Any], required: bool) -> bool:
         class_path = engine_config.get('class')
         if not class_path:
             logger.warning(f"No class path specified for {category}.{name}")
-            return
+            return False
         
-        try:
-            plugin_class = self._import_class(class_path)
-            config = engine_config.get('config', {})
-            self.registry.register(category, name, plugin_class, config)
-        except Exception as e:
-            logger.error(f"Failed to load plugin {category}.{name}: {str(e)}")
+        # Importing is deferred too: plugin modules may pull in heavy model libraries
+        config = engine_config.get('config', {})
+        self.registry.register_lazy(category, name, lambda: self._import_class(class_path), config, required)
+        return True
     
     def _import_class(self, class_path: str) -> Type[IPlugin]:
         module_path, class_name = class_path.rsplit('.', 1)
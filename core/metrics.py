@@ -0,0 +1,157 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from contextlib import contextmanager
+from typing import Any, Dict
+import threading
+import time
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+REQUEST_SECONDS = Histogram(
+    'ocr_request_seconds', 'End-to-end OCR request latency',
+    ['mode'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+STAGE_SECONDS = Histogram(
+    'ocr_stage_seconds', 'OCR pipeline stage latency',
+    ['stage'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+LLM_TOKENS = Counter(
+    'ocr_llm_tokens_total', 'Tokens processed by model calls',
+    ['model', 'kind'], registry=REGISTRY
+)
+IMAGE_BYTES = Counter(
+    'ocr_image_bytes_total', 'Image bytes received and sent to models',
+    ['model', 'kind'], registry=REGISTRY
+)
+ERRORS = Counter(
+    'ocr_errors_total', 'Errors raised by pipeline stages',
+    ['stage'], registry=REGISTRY
+)
+CACHE_LOOKUPS = Counter(
+    'ocr_cache_lookups_total', 'Result cache lookups',
+    ['result'], registry=REGISTRY
+)
+LLM_CACHE_LOOKUPS = Counter(
+    'ocr_llm_cache_lookups_total', 'Prompt-level LLM response cache lookups',
+    ['result'], registry=REGISTRY
+)
+JOB_QUEUE_DEPTH = Gauge(
+    'ocr_job_queue_depth', 'OCR jobs waiting for a worker', registry=REGISTRY
+)
+JOBS_RUNNING = Gauge(
+    'ocr_jobs_running', 'OCR jobs currently running', registry=REGISTRY
+)
+MODEL_CALLS_IN_FLIGHT = Gauge(
+    'ocr_model_calls_in_flight', 'Model calls holding a scheduler slot', registry=REGISTRY
+)
+MODEL_CALLS_WAITING = Gauge(
+    'ocr_model_calls_waiting', 'Model calls waiting for a scheduler slot', registry=REGISTRY
+)
+MODEL_SWITCHES = Counter(
+    'ocr_model_switches_total', 'Times the scheduler switched the model it grants calls to',
+    ['model'], registry=REGISTRY
+)
+
+PLUGIN_LOAD_SECONDS = Gauge(
+    'ocr_plugin_load_seconds', 'Time taken to initialize each plugin',
+    ['plugin'], registry=REGISTRY
+)
+PLUGIN_READY = Gauge(
+    'ocr_plugin_ready', 'Whether a plugin has finished initializing',
+    ['plugin'], registry=REGISTRY
+)
+
+BACKEND_IN_FLIGHT = Gauge(
+    'ocr_ollama_backend_in_flight', 'Model calls in flight per Ollama backend',
+    ['backend'], registry=REGISTRY
+)
+BACKEND_EJECTIONS = Counter(
+    'ocr_ollama_backend_ejections_total', 'Times an Ollama backend was ejected from routing',
+    ['backend'], registry=REGISTRY
+)
+
+MODEL_LOADS = Counter(
+    'ocr_model_loads_total', 'Model calls that had to load the model into memory first',
+    ['model'], registry=REGISTRY
+)
+MODEL_LOAD_SECONDS = Histogram(
+    'ocr_model_load_seconds', 'Time Ollama spent loading a model before serving a call',
+    ['model'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+MODELS_RESIDENT = Gauge(
+    'ocr_models_resident', 'Ollama servers that currently hold each model in memory',
+    ['model'], registry=REGISTRY
+)
+
+COALESCED_REQUESTS = Counter(
+    'ocr_coalesced_requests_total', 'OCR requests that joined an identical in-flight computation',
+    registry=REGISTRY
+)
+
+
+def export() -> bytes:
+    return generate_latest(REGISTRY)
+
+
+class StageTimer:
+    
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.tokens: Dict[str, int] = {'prompt': 0, 'completion': 0}
+        self.image_bytes: Dict[str, int] = {'original': 0, 'sent': 0}
+        self.model_load_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            ERRORS.labels(stage=name).inc()
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def observe(self, name: str, seconds: float) -> None:
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+        with self._lock:
+            entry = self.stages.setdefault(name, {'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+    
+    def record_call(self, response: Any) -> None:
+        metadata = getattr(response, 'metadata', None) or {}
+        model = metadata.get('model', 'unknown')
+        prompt_tokens = metadata.get('prompt_tokens', 0) or 0
+        completion_tokens = metadata.get('completion_tokens', getattr(response, 'tokens_used', 0)) or 0
+        
+        LLM_TOKENS.labels(model=model, kind='prompt').inc(prompt_tokens)
+        LLM_TOKENS.labels(model=model, kind='completion').inc(completion_tokens)
+        with self._lock:
+            self.tokens['prompt'] += prompt_tokens
+            self.tokens['completion'] += completion_tokens
+            self.model_load_seconds += metadata.get('load_seconds', 0.0) or 0.0
+        
+        image = metadata.get('image')
+        if image:
+            IMAGE_BYTES.labels(model=model, kind='original').inc(image['original_bytes'])
+            IMAGE_BYTES.labels(model=model, kind='sent').inc(image['sent_bytes'])
+            with self._lock:
+                self.image_bytes['original'] += image['original_bytes']
+                self.image_bytes['sent'] += image['sent_bytes']
+    
+    def as_metadata(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'total_seconds': round(time.perf_counter() - self.started_at, 3),
+                'stages': {
+                    name: {'count': entry['count'], 'seconds': round(entry['seconds'], 3)}
+                    for name, entry in self.stages.items()
+                },
+                'tokens': dict(self.tokens),
+                'image_bytes': dict(self.image_bytes),
+                'model_load_seconds': round(self.model_load_seconds, 3)
+            }
@@ -1,45 +1,122 @@
-from typing import Dict, Type, Any, Optional, List
+from dataclasses import dataclass
+from typing import Callable, Dict, Type, Any, Optional, List
 from .plugin import IPlugin
+from .metrics import PLUGIN_LOAD_SECONDS, PLUGIN_READY
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class PluginState:
+    status: str = 'pending'
+    required: bool = False
+    load_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
 class ServiceRegistry:
     
     def __init__(self):
         self._services: Dict[str, IPlugin] = {}
         self._configs: Dict[str, Dict[str, Any]] = {}
+        self._factories: Dict[str, Callable[[], Type[IPlugin]]] = {}
+        self._states: Dict[str, PluginState] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
     
     def register(self, category: str, name: str, plugin_class: Type[IPlugin], config: Dict[str, Any]) -> None:
+        self.register_lazy(category, name, lambda: plugin_class, config)
+        self.load(f"{category}.{name}")
+    
+    def register_lazy(self, category: str, name: str, resolve: Callable[[], Type[IPlugin]],
+                      config: Dict[str, Any], required: bool = False) -> None:
         key = f"{category}.{name}"
-        
-        try:
-            instance = plugin_class()
-            instance.initialize(config)
-            self._services[key] = instance
+        with self._lock:
+            self._factories[key] = resolve
             self._configs[key] = config
-            logger.info(f"Registered plugin: {key} (v{instance.version})")
-        except Exception as e:
-            logger.error(f"Failed to register plugin {key}: {str(e)}")
-            raise
+            self._states[key] = PluginState(required=required)
+            self._load_locks[key] = threading.Lock()
+        PLUGIN_READY.labels(plugin=key).set(0)
+    
+    def load(self, key: str) -> IPlugin:
+        with self._load_locks[key]:
+            instance = self._services.get(key)
+            if instance is not None:
+                return instance
+            
+            state = self._states[key]
+            state.status = 'loading'
+            start = time.perf_counter()
+            
+            try:
+                instance = self._factories[key]()()
+                instance.initialize(self._configs[key])
+            except Exception as e:
+                state.status = 'failed'
+                state.error = str(e)
+                state.load_seconds = round(time.perf_counter() - start, 3)
+                logger.error(f"Failed to register plugin {key} after {state.load_seconds:.2f}s: {str(e)}")
+                raise
+            
+            state.load_seconds = round(time.perf_counter() - start, 3)
+            state.status = 'ready'
+            state.error = None
+            self._services[key] = instance
+            PLUGIN_LOAD_SECONDS.labels(plugin=key).set(state.load_seconds)
+            PLUGIN_READY.labels(plugin=key).set(1)
+            logger.info(f"Registered plugin: {key} (v{instance.version}) in {state.load_seconds:.2f}s")
+            return instance
     
     def get(self, category: str, name: str) -> Optional[IPlugin]:
         key = f"{category}.{name}"
-        return self._services.get(key)
+        instance = self._services.get(key)
+        if instance is not None or key not in self._factories:
+            return instance
+        
+        # Failed plugins are not retried on every lookup
+        if self._states[key].status == 'failed':
+            return None
+        
+        try:
+            return self.load(key)
+        except Exception:
+            return None
     
     def list_category(self, category: str) -> Dict[str, IPlugin]:
         prefix = f"{category}."
         return {k.split('.', 1)[1]: v for k, v in self._services.items() if k.startswith(prefix)}
     
+    def claim_pending(self, category: Optional[str] = None) -> List[str]:
+        claimed = []
+        with self._lock:
+            for key, state in self._states.items():
+                if state.status == 'pending' and (category is None or key.startswith(f"{category}.")):
+                    state.status = 'loading'
+                    claimed.append(key)
+        return claimed
+    
+    def states(self) -> Dict[str, PluginState]:
+        return dict(self._states)
+    
+    def ready(self) -> bool:
+        return all(state.status == 'ready' for state in self._states.values() if state.required)
+    
     def unregister(self, category: str, name: str) -> None:
         key = f"{category}.{name}"
         if key in self._services:
             plugin = self._services[key]
             plugin.cleanup()
             del self._services[key]
-            del self._configs[key]
             logger.info(f"Unregistered plugin: {key}")
+        
+        with self._lock:
+            self._factories.pop(key, None)
+            self._configs.pop(key, None)
+            self._states.pop(key, None)
+            self._load_locks.pop(key, None)
     
     def health_check_all(self) -> Dict[str, bool]:
         return {key: plugin.health_check() for key, plugin in self._services.items()}
@@ -19,7 +19,8 @@ def main():
     
     args = parser.parse_args()
     
-    agent = Agent(args.config)
+    # CLI runs only initialize the plugin they use
+    agent = Agent(args.config, startup_mode='lazy' if args.mode == 'cli' else None)
     
     if args.mode == 'cli':
         if args.ocr:
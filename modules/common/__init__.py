@@ -0,0 +1,13 @@
+from .ollama import OllamaClient, OllamaBackendPool, OllamaError, OllamaTimeoutError, OllamaConnectError, create_ollama_client
+from .scheduler import CallScheduler, get_scheduler, schedulers, configure_scheduler
+from .residency import ModelResidency, get_residency, configure_residency
+from .disk_cache import DiskLRU
+from .image import ImageSource, ImageHandle, ImagePreprocessor, PreparedImage, DecodedImage, encode_image, open_image, read_bytes, is_pdf
+
+__all__ = [
+    'OllamaClient', 'OllamaBackendPool', 'OllamaError', 'OllamaTimeoutError', 'OllamaConnectError', 'create_ollama_client',
+    'CallScheduler', 'get_scheduler', 'schedulers', 'configure_scheduler',
+    'ModelResidency', 'get_residency', 'configure_residency',
+    'DiskLRU',
+    'ImageSource', 'ImageHandle', 'ImagePreprocessor', 'PreparedImage', 'DecodedImage', 'encode_image', 'open_image', 'read_bytes', 'is_pdf'
+]
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRU:
+    
+    def __init__(self, directory: str, max_bytes: int, name: str = "Disk cache"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.name = name
+        
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self._load_index()
+    
+    @property
+    def entries(self) -> int:
+        return len(self._index)
+    
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        
+        path = self._path(key)
+        try:
+            data = path.read_text(encoding='utf-8')
+            os.utime(path)
+            return data
+        except OSError as e:
+            logger.warning(f"{self.name} read failed for {key}: {str(e)}")
+            with self._lock:
+                self._bytes -= self._index.pop(key, 0)
+            return None
+    
+    def put(self, key: str, data: str) -> None:
+        encoded = data.encode('utf-8')
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp_path.write_bytes(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"{self.name} write failed for {key}: {str(e)}")
+            return
+        
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = len(encoded)
+            self._bytes += len(encoded)
+            self._evict()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+    
+    def _load_index(self) -> None:
+        entries = []
+        for path in self.directory.glob('*/*.json'):
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            except OSError:
+                continue
+        
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        
+        logger.info(f"{self.name}: {len(self._index)} entries on disk ({self._bytes} bytes)")
+        self._evict()
+    
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
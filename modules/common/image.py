@@ -0,0 +1,262 @@
+from PIL import Image, ImageOps
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import base64
+import hashlib
+import io
+import os
+import threading
+
+ImageSource = Union[str, os.PathLike, bytes, Image.Image, 'ImageHandle']
+
+EXIF_ORIENTATION = 0x0112
+
+
+def read_bytes(source: ImageSource) -> bytes:
+    if isinstance(source, ImageHandle):
+        return source.data
+    
+    if isinstance(source, bytes):
+        return source
+    
+    if isinstance(source, Image.Image):
+        buffer = io.BytesIO()
+        source.save(buffer, format=source.format or 'PNG')
+        return buffer.getvalue()
+    
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def encode_image(source: ImageSource) -> str:
+    return base64.b64encode(read_bytes(source)).decode('utf-8')
+
+
+def open_image(source: ImageSource) -> Image.Image:
+    if isinstance(source, ImageHandle):
+        return source.image
+    
+    if isinstance(source, Image.Image):
+        return source
+    
+    if isinstance(source, bytes):
+        return Image.open(io.BytesIO(source))
+    
+    return Image.open(source)
+
+
+def is_pdf(source: ImageSource) -> bool:
+    if isinstance(source, ImageHandle):
+        return source.is_pdf
+    
+    if isinstance(source, Image.Image):
+        return False
+    
+    if isinstance(source, bytes):
+        return source[:5] == b'%PDF-'
+    
+    return Path(source).suffix.lower() == '.pdf'
+
+
+def describe_source(source: ImageSource) -> str:
+    if isinstance(source, ImageHandle):
+        return describe_source(source.source)
+    
+    if isinstance(source, bytes):
+        return f"<{len(source)} bytes>"
+    
+    if isinstance(source, Image.Image):
+        return f"<image {source.width}x{source.height}>"
+    
+    return str(source)
+
+
+@dataclass
+class DecodedImage:
+    image: Image.Image
+    original: Optional[bytes]
+    original_bytes: int
+    original_size: Tuple[int, int]
+    format: Optional[str] = None
+    rotated: bool = False
+    
+    @classmethod
+    def from_source(cls, source: ImageSource) -> 'DecodedImage':
+        if isinstance(source, Image.Image):
+            # In-memory images have no encoded form yet; report their decoded size
+            original_bytes = source.width * source.height * len(source.getbands())
+            return cls(source, None, original_bytes, source.size, source.format)
+        
+        original = read_bytes(source)
+        image = Image.open(io.BytesIO(original))
+        image.load()
+        return cls(image, original, len(original), image.size, image.format)
+    
+    def oriented(self) -> 'DecodedImage':
+        if self.image.getexif().get(EXIF_ORIENTATION, 1) == 1:
+            return self
+        return replace(self, image=ImageOps.exif_transpose(self.image), rotated=True)
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    original_bytes: int
+    original_size: Optional[Tuple[int, int]] = None
+    size: Optional[Tuple[int, int]] = None
+    _encoded: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def sent_bytes(self) -> int:
+        return len(self.data)
+    
+    def encode(self) -> str:
+        if self._encoded is None:
+            self._encoded = base64.b64encode(self.data).decode('utf-8')
+        return self._encoded
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'original_bytes': self.original_bytes,
+            'sent_bytes': self.sent_bytes,
+            'original_size': list(self.original_size) if self.original_size else None,
+            'sent_size': list(self.size) if self.size else None
+        }
+
+
+class ImagePreprocessor:
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.fix_orientation = config.get('fix_orientation', True)
+        self.max_side = config.get('max_side', 2048)
+        self.format = config.get('format', 'JPEG').upper()
+        self.quality = config.get('quality', 90)
+    
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        return (self.enabled, self.fix_orientation, self.max_side, self.format, self.quality)
+    
+    def prepare(self, source: ImageSource, decoded: Optional[DecodedImage] = None) -> PreparedImage:
+        if not self.enabled:
+            data = read_bytes(source)
+            return PreparedImage(data, len(data))
+        
+        if decoded is None:
+            decoded = DecodedImage.from_source(source)
+            if self.fix_orientation:
+                decoded = decoded.oriented()
+        
+        image = decoded.image
+        changed = decoded.rotated
+        
+        if self.max_side and max(image.size) > self.max_side:
+            # The decoded image may be the caller's or shared with other preprocessors
+            image = image.copy()
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+            changed = True
+        
+        original = decoded.original
+        if original is not None and not changed and decoded.format == self.format:
+            return PreparedImage(original, decoded.original_bytes, decoded.original_size, image.size)
+        
+        data = self._encode(image)
+        if original is not None and not changed and len(data) >= decoded.original_bytes:
+            data = original
+        
+        return PreparedImage(data, decoded.original_bytes, decoded.original_size, image.size)
+    
+    def _encode(self, image: Image.Image) -> bytes:
+        if self.format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+        
+        buffer = io.BytesIO()
+        if self.format == 'JPEG':
+            image.save(buffer, format='JPEG', quality=self.quality, optimize=True)
+        else:
+            image.save(buffer, format=self.format)
+        return buffer.getvalue()
+
+
+class ImageHandle:
+    
+    def __init__(self, source: ImageSource):
+        self.source = source.source if isinstance(source, ImageHandle) else source
+        self._data: Optional[bytes] = None
+        self._image: Optional[Image.Image] = None
+        self._decoded: Optional[DecodedImage] = None
+        self._oriented: Optional[DecodedImage] = None
+        self._digest: Optional[str] = None
+        self._prepared: Dict[Tuple[Any, ...], PreparedImage] = {}
+        self._lock = threading.Lock()
+        self._decode_lock = threading.Lock()
+        self._prepare_locks: Dict[Tuple[Any, ...], threading.Lock] = {}
+    
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = read_bytes(self.source)
+        return self._data
+    
+    @property
+    def image(self) -> Image.Image:
+        if self._image is None:
+            decoded = self.decoded()
+            with self._lock:
+                if self._image is None:
+                    image = decoded.image
+                    if image.mode != 'RGB':
+                        image = image.convert('RGB')
+                    self._image = image
+        return self._image
+    
+    def decoded(self, fix_orientation: bool = False) -> DecodedImage:
+        # One decode per request; every preprocessor only resizes and encodes its own copy
+        with self._decode_lock:
+            if self._decoded is None:
+                source = self.source if isinstance(self.source, Image.Image) else self.data
+                self._decoded = DecodedImage.from_source(source)
+            if not fix_orientation:
+                return self._decoded
+            if self._oriented is None:
+                self._oriented = self._decoded.oriented()
+            return self._oriented
+    
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+    
+    @property
+    def is_pdf(self) -> bool:
+        if isinstance(self.source, Image.Image):
+            return False
+        return self.data[:5] == b'%PDF-'
+    
+    def prepare(self, preprocessor: ImagePreprocessor) -> PreparedImage:
+        key = preprocessor.key
+        with self._lock:
+            prepared = self._prepared.get(key)
+            if prepared is not None:
+                return prepared
+            key_lock = self._prepare_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            prepared = self._prepared.get(key)
+            if prepared is None:
+                source = self.source if isinstance(self.source, Image.Image) else self.data
+                decoded = self.decoded(preprocessor.fix_orientation) if preprocessor.enabled else None
+                prepared = preprocessor.prepare(source, decoded)
+                self._prepared[key] = prepared
+        return prepared
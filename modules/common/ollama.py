@@ -0,0 +1,404 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Union
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+import httpx
+from core.metrics import BACKEND_EJECTIONS, BACKEND_IN_FLIGHT
+from .residency import get_residency
+from .scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HTTP_CONFIG = {
+    'max_connections': 16,
+    'max_keepalive_connections': 8,
+    'keepalive_expiry': 30.0,
+    'connect_timeout': 5.0,
+    'read_timeout': 300.0,
+    'total_timeout': 600.0,
+    'health_timeout': 5.0
+}
+
+DEFAULT_ROUTING_CONFIG = {
+    'max_failures': 3,
+    'eject_seconds': 30.0,
+    'max_eject_seconds': 300.0,
+    'latency_alpha': 0.3
+}
+
+
+class OllamaError(RuntimeError):
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaTimeoutError(OllamaError):
+    pass
+
+
+class OllamaConnectError(OllamaError):
+    pass
+
+
+def _http_error(base_url: str, e: httpx.HTTPError) -> OllamaError:
+    if isinstance(e, httpx.ConnectError):
+        return OllamaConnectError(f"Ollama at {base_url} is unreachable: {str(e)}")
+    status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+    return OllamaError(f"Ollama request to {base_url} failed: {str(e)}", status_code)
+
+
+def _with_response_text(result: Dict[str, Any]) -> Dict[str, Any]:
+    # /api/chat puts the text in message.content where /api/generate uses response
+    if 'response' in result:
+        return result
+    return {**result, 'response': (result.get('message') or {}).get('content', '')}
+
+
+class OllamaClient:
+    
+    def __init__(self, base_url: str, config: Optional[Dict[str, Any]] = None):
+        self.base_url = (base_url or '').rstrip('/')
+        self.config = {**DEFAULT_HTTP_CONFIG, **(config or {})}
+        
+        self._limits = httpx.Limits(
+            max_connections=self.config['max_connections'],
+            max_keepalive_connections=self.config['max_keepalive_connections'],
+            keepalive_expiry=self.config['keepalive_expiry']
+        )
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    def _timeout(self, timeout: Optional[float] = None) -> httpx.Timeout:
+        read_timeout = timeout if timeout is not None else self.config['read_timeout']
+        total_timeout = self.config['total_timeout']
+        if total_timeout:
+            read_timeout = min(read_timeout, total_timeout)
+        
+        return httpx.Timeout(
+            read_timeout,
+            connect=self.config['connect_timeout']
+        )
+    
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(base_url=self.base_url, limits=self._limits)
+        return self._client
+    
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # httpx.AsyncClient is bound to the event loop it first runs on
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(base_url=self.base_url, limits=self._limits)
+            self._async_clients[loop] = client
+        return client
+    
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                 on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        return self._post('/api/generate', payload, timeout, on_token)
+    
+    def chat(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+             on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        # The reply is also returned as 'response' so callers handle both endpoints alike
+        return self._post('/api/chat', payload, timeout, on_token)
+    
+    def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float],
+              on_token: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        try:
+            with get_scheduler(self.base_url).slot(payload.get('model')):
+                if on_token is not None:
+                    result = self._stream(path, payload, timeout, on_token)
+                else:
+                    response = self.client.post(path, json=payload, timeout=self._timeout(timeout))
+                    response.raise_for_status()
+                    result = _with_response_text(response.json())
+        except httpx.TimeoutException as e:
+            raise OllamaTimeoutError(f"Ollama request to {self.base_url} timed out: {str(e)}") from e
+        except httpx.HTTPError as e:
+            raise _http_error(self.base_url, e) from e
+        
+        get_residency().observe(self.base_url, payload.get('model'), result)
+        return result
+    
+    def _stream(self, path: str, payload: Dict[str, Any], timeout: Optional[float],
+                on_token: Callable[[str], None]) -> Dict[str, Any]:
+        total_timeout = self.config['total_timeout']
+        deadline = time.monotonic() + total_timeout if total_timeout else None
+        
+        parts = []
+        final: Dict[str, Any] = {}
+        
+        with self.client.stream('POST', path, json={**payload, 'stream': True},
+                                timeout=self._timeout(timeout)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise OllamaError(f"Ollama stream from {self.base_url} failed: {chunk['error']}")
+                
+                token = _with_response_text(chunk)['response']
+                if token:
+                    parts.append(token)
+                    on_token(token)
+                
+                if chunk.get('done'):
+                    final = chunk
+                    break
+                
+                if deadline is not None and time.monotonic() > deadline:
+                    raise OllamaTimeoutError(
+                        f"Ollama stream from {self.base_url} exceeded total timeout of {total_timeout}s"
+                    )
+        
+        return {**final, 'response': ''.join(parts)}
+    
+    async def generate_async(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        total_timeout = self.config['total_timeout'] or None
+        try:
+            async with get_scheduler(self.base_url).slot_async(payload.get('model')):
+                response = await asyncio.wait_for(
+                    self.async_client.post('/api/generate', json=payload, timeout=self._timeout(timeout)),
+                    timeout=total_timeout
+                )
+            response.raise_for_status()
+            result = response.json()
+        except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+            raise OllamaTimeoutError(f"Ollama request to {self.base_url} timed out: {str(e)}") from e
+        except httpx.HTTPError as e:
+            raise _http_error(self.base_url, e) from e
+        
+        get_residency().observe(self.base_url, payload.get('model'), result)
+        return result
+    
+    def ps(self) -> List[Dict[str, Any]]:
+        response = self.client.get('/api/ps', timeout=self.config['health_timeout'])
+        response.raise_for_status()
+        return response.json().get('models', [])
+    
+    def health_check(self) -> bool:
+        try:
+            response = self.client.get('/api/tags', timeout=self.config['health_timeout'])
+            return response.status_code == 200
+        except Exception:
+            return False
+    
+    async def health_check_async(self) -> bool:
+        try:
+            response = await self.async_client.get('/api/tags', timeout=self.config['health_timeout'])
+            return response.status_code == 200
+        except Exception:
+            return False
+    
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        
+        for loop, client in list(self._async_clients.items()):
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
+        self._async_clients.clear()
+
+
+class OllamaBackend:
+    
+    def __init__(self, base_url: str, config: Optional[Dict[str, Any]] = None):
+        self.client = OllamaClient(base_url, config)
+        self.base_url = self.client.base_url
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+    
+    def admitted(self, now: float) -> bool:
+        return self.ejected_until <= now
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'latency_seconds': round(self.latency, 3) if self.latency is not None else None,
+            'failures': self.failures,
+            'ejected': not self.admitted(time.monotonic())
+        }
+
+
+class OllamaBackendPool:
+    
+    def __init__(self, base_urls: List[str], config: Optional[Dict[str, Any]] = None,
+                 routing: Optional[Dict[str, Any]] = None):
+        if not base_urls:
+            raise ValueError("At least one Ollama backend URL is required")
+        
+        self.backends = [OllamaBackend(url, config) for url in base_urls]
+        self.base_url = ','.join(backend.base_url for backend in self.backends)
+        self.routing = {**DEFAULT_ROUTING_CONFIG, **(routing or {})}
+        self._lock = threading.Lock()
+    
+    def _pick(self, exclude: List[OllamaBackend]) -> Optional[OllamaBackend]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend not in exclude]
+            if not candidates:
+                return None
+            
+            admitted = [backend for backend in candidates if backend.admitted(now)]
+            if not admitted:
+                # Every backend is ejected; try the one that comes back soonest
+                backend = min(candidates, key=lambda b: b.ejected_until)
+            else:
+                known = [b.latency for b in admitted if b.latency is not None]
+                default_latency = min(known) if known else 1.0
+                backend = min(
+                    admitted,
+                    key=lambda b: (b.in_flight + 1) * (b.latency if b.latency is not None else default_latency)
+                )
+            
+            backend.in_flight += 1
+        BACKEND_IN_FLIGHT.labels(backend=backend.base_url).inc()
+        return backend
+    
+    def _release(self, backend: OllamaBackend, elapsed: float, error: Optional[Exception]) -> None:
+        with self._lock:
+            backend.in_flight -= 1
+            
+            # Client errors (4xx) say nothing about the backend's health
+            if error is None or (error.status_code is not None and error.status_code < 500):
+                alpha = self.routing['latency_alpha']
+                if error is None:
+                    backend.latency = elapsed if backend.latency is None else alpha * elapsed + (1 - alpha) * backend.latency
+                if backend.ejections:
+                    logger.info(f"Ollama backend {backend.base_url} readmitted")
+                backend.failures = 0
+                backend.ejections = 0
+                backend.ejected_until = 0.0
+            else:
+                backend.failures += 1
+                if backend.failures >= self.routing['max_failures']:
+                    self._eject(backend, str(error))
+        BACKEND_IN_FLIGHT.labels(backend=backend.base_url).dec()
+    
+    def _eject(self, backend: OllamaBackend, reason: str) -> None:
+        eject_seconds = min(
+            self.routing['eject_seconds'] * (2 ** backend.ejections),
+            self.routing['max_eject_seconds']
+        )
+        backend.ejections += 1
+        backend.ejected_until = time.monotonic() + eject_seconds
+        BACKEND_EJECTIONS.labels(backend=backend.base_url).inc()
+        logger.warning(f"Ollama backend {backend.base_url} ejected for {eject_seconds:.0f}s: {reason}")
+    
+    @contextmanager
+    def _backend(self, tried: List[OllamaBackend]):
+        backend = self._pick(tried)
+        tried.append(backend)
+        start = time.monotonic()
+        try:
+            yield backend
+        except OllamaError as e:
+            self._release(backend, time.monotonic() - start, e)
+            raise
+        except BaseException:
+            with self._lock:
+                backend.in_flight -= 1
+            BACKEND_IN_FLIGHT.labels(backend=backend.base_url).dec()
+            raise
+        else:
+            self._release(backend, time.monotonic() - start, None)
+    
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                 on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        return self._route(lambda client: client.generate(payload, timeout, on_token))
+    
+    def chat(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+             on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        return self._route(lambda client: client.chat(payload, timeout, on_token))
+    
+    def _route(self, call: Callable[[OllamaClient], Dict[str, Any]]) -> Dict[str, Any]:
+        # Each backend client waits for a slot from its own server's scheduler
+        tried: List[OllamaBackend] = []
+        while True:
+            try:
+                with self._backend(tried) as backend:
+                    return call(backend.client)
+            except OllamaConnectError as e:
+                # Nothing reached the backend, so another one can take the call
+                if len(tried) >= len(self.backends):
+                    raise
+                logger.warning(f"{str(e)}; retrying on another backend")
+    
+    async def generate_async(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        tried: List[OllamaBackend] = []
+        while True:
+            try:
+                with self._backend(tried) as backend:
+                    return await backend.client.generate_async(payload, timeout)
+            except OllamaConnectError as e:
+                if len(tried) >= len(self.backends):
+                    raise
+                logger.warning(f"{str(e)}; retrying on another backend")
+    
+    def health_check(self) -> bool:
+        results = [self._probe(backend, backend.client.health_check()) for backend in self.backends]
+        return any(results)
+    
+    async def health_check_async(self) -> bool:
+        results = await asyncio.gather(*(backend.client.health_check_async() for backend in self.backends))
+        return any([self._probe(backend, healthy) for backend, healthy in zip(self.backends, results)])
+    
+    def _probe(self, backend: OllamaBackend, healthy: bool) -> bool:
+        with self._lock:
+            ejected = not backend.admitted(time.monotonic())
+            if healthy and (ejected or backend.failures):
+                logger.info(f"Ollama backend {backend.base_url} passed health check, readmitted")
+                backend.failures = 0
+                backend.ejections = 0
+                backend.ejected_until = 0.0
+            elif not healthy and not ejected:
+                backend.failures = self.routing['max_failures']
+                self._eject(backend, "health check failed")
+        return healthy
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {backend.base_url: backend.stats() for backend in self.backends}
+    
+    def close(self) -> None:
+        for backend in self.backends:
+            backend.client.close()
+
+
+def backend_urls(config: Dict[str, Any], env_var: str = 'OLLAMA_BASE_URL') -> List[str]:
+    backends = config.get('backends')
+    if not backends:
+        backends = os.getenv(env_var, config.get('base_url')) or ''
+    if isinstance(backends, str):
+        backends = backends.split(',')
+    return [url.strip() for url in backends if url and url.strip()]
+
+
+def create_ollama_client(config: Dict[str, Any], env_var: str = 'OLLAMA_BASE_URL') -> Union[OllamaClient, OllamaBackendPool]:
+    urls = backend_urls(config, env_var)
+    if len(urls) == 1:
+        return OllamaClient(urls[0], config.get('http'))
+    return OllamaBackendPool(urls, config.get('http'), config.get('routing'))
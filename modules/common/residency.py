@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS = 1e9
+
+
+def _leaf_clients(client: Any) -> List[Any]:
+    # Backend pools expose one client per server; every server holds its own copy of a model
+    backends = getattr(client, 'backends', None)
+    if backends is not None:
+        return [backend.client for backend in backends]
+    return [client]
+
+
+class ModelResidency:
+    
+    def __init__(self, poll_interval_seconds: float = 30.0, cold_load_threshold_seconds: float = 0.5,
+                 warm_up_timeout: float = 300.0):
+        self.poll_interval_seconds = poll_interval_seconds
+        self.cold_load_threshold_seconds = cold_load_threshold_seconds
+        self.warm_up_timeout = warm_up_timeout
+        
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._loaded: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._pending: List[Tuple[Any, str, Optional[Any]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def configure(self, config: Dict[str, Any]) -> 'ModelResidency':
+        self.poll_interval_seconds = config.get('poll_interval_seconds', self.poll_interval_seconds)
+        self.cold_load_threshold_seconds = config.get('cold_load_threshold_seconds', self.cold_load_threshold_seconds)
+        self.warm_up_timeout = config.get('warm_up_timeout', self.warm_up_timeout)
+        return self
+    
+    def register(self, client: Any, model: str, keep_alive: Optional[Any] = None, warm_up: bool = True) -> None:
+        # Plugins register before the server has configured residency and the scheduler, and
+        # initialize() must not block on a model load, so warm-ups wait for the residency thread
+        with self._lock:
+            self._models[model] = {'keep_alive': keep_alive}
+            for leaf in _leaf_clients(client):
+                self._clients[leaf.base_url] = leaf
+                if warm_up:
+                    self._pending.append((leaf, model, keep_alive))
+        self._wake.set()
+    
+    def warm_up(self, client: Any, model: str, keep_alive: Optional[Any] = None) -> Optional[float]:
+        # A generate call without a prompt only loads the model
+        payload: Dict[str, Any] = {'model': model}
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        
+        start = time.perf_counter()
+        try:
+            client.generate(payload, timeout=self.warm_up_timeout)
+        except Exception as e:
+            logger.warning(f"Warm-up of {model} on {client.base_url} failed: {str(e)}")
+            return None
+        
+        seconds = time.perf_counter() - start
+        logger.info(f"Model {model} warm on {client.base_url} in {seconds:.2f}s")
+        return seconds
+    
+    def keep_alive(self, model: str) -> Optional[Any]:
+        return self._models.get(model, {}).get('keep_alive')
+    
+    def observe(self, base_url: str, model: Optional[str], result: Dict[str, Any]) -> float:
+        from core.metrics import MODEL_LOADS, MODEL_LOAD_SECONDS
+        
+        if not model:
+            return 0.0
+        
+        load_seconds = (result.get('load_duration') or 0) / NANOSECONDS
+        if load_seconds >= self.cold_load_threshold_seconds:
+            MODEL_LOADS.labels(model=model).inc()
+            MODEL_LOAD_SECONDS.labels(model=model).observe(load_seconds)
+            logger.info(f"Model {model} was loaded on {base_url} ({load_seconds:.2f}s)")
+        
+        with self._lock:
+            entry = self._loaded.setdefault((base_url, model), {})
+            entry['last_used'] = time.time()
+        return load_seconds
+    
+    def refresh(self) -> Dict[str, List[Dict[str, Any]]]:
+        from core.metrics import MODELS_RESIDENT
+        
+        with self._lock:
+            clients = dict(self._clients)
+            models = set(self._models)
+        
+        loaded: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        reachable = set()
+        for base_url, client in clients.items():
+            try:
+                running = client.ps()
+            except Exception as e:
+                logger.debug(f"Listing loaded models on {base_url} failed: {str(e)}")
+                continue
+            reachable.add(base_url)
+            for entry in running:
+                name = entry.get('name') or entry.get('model')
+                loaded[(base_url, name)] = {
+                    'size_vram': entry.get('size_vram'),
+                    'expires_at': entry.get('expires_at')
+                }
+        
+        with self._lock:
+            previous = self._loaded
+            for key, entry in loaded.items():
+                entry['last_used'] = previous.get(key, {}).get('last_used')
+            # Keep what we know about servers we could not reach this round
+            for key, entry in previous.items():
+                if key[0] not in reachable:
+                    loaded.setdefault(key, entry)
+            self._loaded = loaded
+        
+        for model in models | {name for _, name in loaded}:
+            MODELS_RESIDENT.labels(model=model).set(sum(1 for _, name in loaded if name == model))
+        
+        return self.snapshot()
+    
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            servers: Dict[str, List[Dict[str, Any]]] = {base_url: [] for base_url in self._clients}
+            for (base_url, model), entry in sorted(self._loaded.items()):
+                servers.setdefault(base_url, []).append({
+                    'model': model,
+                    'keep_alive': self.keep_alive(model),
+                    **entry
+                })
+            return servers
+    
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-residency", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval_seconds)
+            self._thread = None
+    
+    def _warm_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for client, model, keep_alive in pending:
+            if self._stop.is_set():
+                return
+            self.warm_up(client, model, keep_alive)
+    
+    def _loop(self) -> None:
+        # Woken early by register() so plugins initialized after startup are warmed promptly
+        while not self._stop.is_set():
+            self._warm_pending()
+            self.refresh()
+            self._wake.wait(self.poll_interval_seconds)
+            self._wake.clear()
+
+
+_residency = ModelResidency()
+
+
+def get_residency() -> ModelResidency:
+    return _residency
+
+
+def configure_residency(config: Dict[str, Any]) -> ModelResidency:
+    # Plugins may register before the server reads its config, so settings are applied in place
+    return _residency.configure(config)
@@ -0,0 +1,196 @@
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+from core.metrics import MODEL_SWITCHES
+
+logger = logging.getLogger(__name__)
+
+
+class _Ticket:
+    __slots__ = ('model', 'enqueued_at')
+    
+    def __init__(self, model: Optional[str]):
+        self.model = model
+        self.enqueued_at = time.monotonic()
+
+
+class CallScheduler:
+    
+    def __init__(self, max_concurrent_calls: int = 8, affinity: bool = False,
+                 max_consecutive_calls: int = 16, max_wait_seconds: float = 5.0):
+        self.max_concurrent_calls = max_concurrent_calls
+        # With affinity, calls are granted to one model at a time so a single GPU does not
+        # swap models back and forth; the window ends after max_consecutive_calls or once a
+        # call for another model has waited max_wait_seconds
+        self.affinity = affinity
+        self.max_consecutive_calls = max_consecutive_calls
+        self.max_wait_seconds = max_wait_seconds
+        
+        self._condition = threading.Condition()
+        self._queues: Dict[Optional[str], Deque[_Ticket]] = {}
+        self._running: Dict[Optional[str], int] = {}
+        self.active_model: Optional[str] = None
+        self._window_calls = 0
+        self._window_started = time.monotonic()
+        self._draining = False
+        self.switches = 0
+        self.in_flight = 0
+        self.waiting = 0
+    
+    def _oldest_waiting(self, exclude: Optional[str] = None) -> Optional[_Ticket]:
+        heads = [queue[0] for model, queue in self._queues.items() if queue and model != exclude]
+        return min(heads, key=lambda ticket: ticket.enqueued_at) if heads else None
+    
+    def _switch(self, ticket: _Ticket) -> None:
+        # The first window after startup is not a switch
+        if self._window_calls:
+            self.switches += 1
+            MODEL_SWITCHES.labels(model=ticket.model or 'unknown').inc()
+            logger.debug(f"Model calls switched from {self.active_model} to {ticket.model} "
+                         f"after {self._window_calls} calls")
+        self.active_model = ticket.model
+        self._window_calls = 0
+        self._window_started = time.monotonic()
+        self._draining = False
+        self._condition.notify_all()
+    
+    def _update(self) -> None:
+        other = self._oldest_waiting(exclude=self.active_model)
+        if other is None:
+            self._draining = False
+            return
+        
+        if not self._draining:
+            self._draining = (
+                not self._queues.get(self.active_model) or
+                self._window_calls >= self.max_consecutive_calls or
+                time.monotonic() >= self._deadline(other)
+            )
+        
+        # Calls already running for the active model finish before the next one starts
+        if self._draining and not self._running.get(self.active_model):
+            self._switch(other)
+    
+    def _grantable(self, ticket: _Ticket) -> bool:
+        if self._queues[ticket.model][0] is not ticket:
+            return False
+        if self.affinity:
+            self._update()
+            if ticket.model != self.active_model or self._draining:
+                return False
+        return self.in_flight < self.max_concurrent_calls
+    
+    def _deadline(self, ticket: _Ticket) -> float:
+        # Waiting only counts against the current window, or every window would be cut short
+        # once the queues are backed up
+        return max(ticket.enqueued_at, self._window_started) + self.max_wait_seconds
+    
+    def _wait_timeout(self, ticket: _Ticket) -> Optional[float]:
+        # Wake up when this call's wait crosses the fairness bound so it can claim a switch
+        if not self.affinity:
+            return None
+        remaining = self._deadline(ticket) - time.monotonic()
+        return remaining if remaining > 0 else None
+    
+    def _acquire(self, model: Optional[str]) -> None:
+        ticket = _Ticket(model)
+        with self._condition:
+            self._queues.setdefault(model, deque()).append(ticket)
+            self.waiting += 1
+            while not self._grantable(ticket):
+                self._condition.wait(self._wait_timeout(ticket))
+            
+            self._queues[model].popleft()
+            self.waiting -= 1
+            self.in_flight += 1
+            self._running[model] = self._running.get(model, 0) + 1
+            self._window_calls += 1
+            self._condition.notify_all()
+    
+    def _release(self, model: Optional[str]) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._running[model] -= 1
+            self._condition.notify_all()
+    
+    @contextmanager
+    def slot(self, model: Optional[str] = None):
+        self._acquire(model)
+        try:
+            yield
+        finally:
+            self._release(model)
+    
+    @asynccontextmanager
+    async def slot_async(self, model: Optional[str] = None):
+        loop = asyncio.get_running_loop()
+        acquired = loop.run_in_executor(None, self._acquire, model)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # The executor thread still takes the slot once it is granted; hand it straight back
+            def release(future):
+                if not future.cancelled() and future.exception() is None:
+                    self._release(model)
+            acquired.add_done_callback(release)
+            raise
+        try:
+            yield
+        finally:
+            self._release(model)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'max_concurrent_calls': self.max_concurrent_calls,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'affinity': self.affinity,
+                'active_model': self.active_model,
+                'switches': self.switches,
+                'waiting_by_model': {
+                    model or 'unknown': len(queue) for model, queue in self._queues.items() if queue
+                }
+            }
+
+
+_config: Dict[str, Any] = {}
+_schedulers: Dict[Optional[str], CallScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _create(config: Dict[str, Any]) -> CallScheduler:
+    return CallScheduler(
+        max_concurrent_calls=config.get('max_concurrent_calls', 8),
+        affinity=config.get('affinity', False),
+        max_consecutive_calls=config.get('max_consecutive_calls', 16),
+        max_wait_seconds=config.get('max_wait_seconds', 5.0)
+    )
+
+
+def get_scheduler(base_url: Optional[str] = None) -> CallScheduler:
+    # Every Ollama server has its own GPU, so each gets its own call budget and affinity window
+    with _schedulers_lock:
+        scheduler = _schedulers.get(base_url)
+        if scheduler is None:
+            scheduler = _schedulers[base_url] = _create(_config)
+        return scheduler
+
+
+def schedulers() -> Dict[Optional[str], CallScheduler]:
+    with _schedulers_lock:
+        return dict(_schedulers)
+
+
+def configure_scheduler(config: Dict[str, Any]) -> None:
+    global _config
+    with _schedulers_lock:
+        _config = dict(config)
+        _schedulers.clear()
+    scheduler = _create(_config)
+    logger.info(f"Model call scheduler: {scheduler.max_concurrent_calls} concurrent calls per backend, "
+                f"model affinity {'on' if scheduler.affinity else 'off'}")
@@ -0,0 +1,126 @@
+from modules.common.disk_cache import DiskLRU
+from core.metrics import LLM_CACHE_LOOKUPS
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Payload fields that do not change what the model generates
+IGNORED_FIELDS = ('stream', 'keep_alive')
+
+
+class ResponseCache:
+    
+    def __init__(self, memory_max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        
+        self._memory: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk = DiskLRU(disk_dir, disk_max_bytes, "Response cache") if disk_dir else None
+        
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+        self.bypassed = 0
+    
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['ResponseCache']:
+        config = config or {}
+        if not config.get('enabled', False):
+            return None
+        return cls(
+            memory_max_bytes=int(config.get('memory_mb', 64) * 1024 * 1024),
+            disk_dir=config.get('disk_dir'),
+            disk_max_bytes=int(config.get('disk_max_mb', 256) * 1024 * 1024)
+        )
+    
+    @staticmethod
+    def cacheable(payload: Dict[str, Any]) -> bool:
+        # Only greedy generations repeat; an unset temperature means the server's sampling default
+        temperature = (payload.get('options') or {}).get('temperature')
+        return temperature == 0
+    
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        key_data = {name: value for name, value in payload.items() if name not in IGNORED_FIELDS}
+        # Images are keyed by digest so the key itself stays small
+        key_data['images'] = ResponseCache._digests(payload.get('images'))
+        if 'messages' in payload:
+            key_data['messages'] = [
+                {**message, 'images': ResponseCache._digests(message.get('images'))} for message in payload['messages']
+            ]
+        encoded = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _digests(images) -> list:
+        return [hashlib.sha256(image.encode('ascii')).hexdigest() for image in images or []]
+    
+    def lookup(self, payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if not self.cacheable(payload):
+            with self._lock:
+                self.bypassed += 1
+            LLM_CACHE_LOOKUPS.labels(result='bypass').inc()
+            return None, None
+        
+        key = self.make_key(payload)
+        return key, self.get(key)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits['memory'] += 1
+                LLM_CACHE_LOOKUPS.labels(result='memory_hit').inc()
+                return json.loads(entry[0])
+        
+        data = self._disk.get(key) if self._disk else None
+        with self._lock:
+            if data is not None:
+                self.hits['disk'] += 1
+                LLM_CACHE_LOOKUPS.labels(result='disk_hit').inc()
+                self._put_memory(key, data)
+                return json.loads(data)
+            
+            self.misses += 1
+            LLM_CACHE_LOOKUPS.labels(result='miss').inc()
+            return None
+    
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        data = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._put_memory(key, data)
+        if self._disk:
+            self._disk.put(key, data)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': dict(self.hits),
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': self._disk.entries if self._disk else 0,
+                'disk_bytes': self._disk.bytes if self._disk else 0
+            }
+    
+    def _put_memory(self, key: str, data: str) -> None:
+        size = len(data.encode('utf-8'))
+        if size > self.memory_max_bytes:
+            return
+        
+        _, previous_size = self._memory.pop(key, (None, 0))
+        self._memory_bytes -= previous_size
+        self._memory[key] = (data, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
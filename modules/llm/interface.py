@@ -2,6 +2,8 @@ from abc import abstractmethod
 from core.plugin import IPlugin
 from typing import List, Dict, Any
 from dataclasses import dataclass, field
+import asyncio
+import functools
 
 
 @dataclass
@@ -20,3 +22,7 @@ class ILLMProvider(IPlugin):
     @abstractmethod
     def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
         pass
+    
+    async def generate_async(self, prompt: str, **kwargs) -> LLMResponse:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.generate, prompt, **kwargs))
@@ -1,19 +1,107 @@
 from modules.llm.interface import ILLMProvider, LLMResponse
-from typing import Dict, Any, Optional
+from modules.common.ollama import OllamaClient, OllamaBackendPool, create_ollama_client
+from modules.common.residency import get_residency
+from modules.common.image import ImageSource, ImageHandle, ImagePreprocessor, PreparedImage
+from modules.llm.cache import ResponseCache
+from modules.llm.tokens import estimate_tokens, pack, split_by_tokens
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 import logging
-import requests
-import base64
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
 
+ANALYSIS_INSTRUCTIONS = """## 1. DATA VALIDATION & QUALITY
+- Completeness: missing fields, truncated data, unclear values
+- Consistency: mismatched values, logical errors, formatting issues
+- Anomalies: unusual patterns, out-of-range values, unexpected data
+- OCR errors or ambiguities
+
+## 2. CAUSE-EFFECT ANALYSIS
+For each anomaly or unusual pattern:
+- **Identify the effect** (what is abnormal)
+- **Analyze control responses** (what actions system is taking)
+- **Explain the cause** (why this is happening)
+- Example: "Valve 100% + Heat Exchanger 51.4°C but Bath only 29°C 
+           → System actively heating but insufficient heat delivery 
+           → Possible causes: high heat loss, circulation issue, recent water change"
+
+For environmental factors:
+- Connect external conditions to system behavior
+- Example: "-10.2°C outdoor → Rapid heat loss in open-air baths 
+           → System compensating with higher temps (43.9°C vs 42°C target)"
+
+## 3. OPERATIONAL STATE ASSESSMENT
+- Evaluate if control actions match targets
+- Identify stuck/failed vs correctly operating components
+- Example: "0% valve with 43.9°C bath (target 42°C) = CORRECT (no heating needed), 
+           NOT a malfunction"
+- Assess system efficiency and performance
+
+## 4. CONTEXTUAL INTELLIGENCE
+- Domain-specific insights (safety, efficiency, operational norms)
+- Time-based patterns and their implications
+- Priority assessment (Critical/Important/Monitor)
+- Safety threshold implications
+
+## 5. EXPERT RECOMMENDATIONS
+**Critical (Immediate Action):**
+- Issues requiring urgent attention
+- Safety concerns
+
+**Important (Near-term):**
+- Performance optimization
+- Preventive measures
+
+**Monitoring (Track):**
+- Trends to watch
+- Normal variation vs developing issues
+
+**Root Cause Hypotheses:**
+- Clearly mark as hypotheses
+- Suggest verification steps
+
+Use clear markdown: ## headers, **bold** critical items, bullet points. Be specific and actionable."""
+
+MERGE_DOCUMENTS_PROMPT = """These markdown documents were produced from consecutive parts of one source. Combine them into one markdown document:
+
+{parts}
+
+RULES:
+- Keep every value EXACTLY as written
+- Merge sections and tables that repeat the same information
+- Keep the original order
+- NO analysis or commentary"""
+
+MERGE_ANALYSES_PROMPT = """These analyses cover consecutive parts of one document. Combine them into one report with the same five sections:
+
+{parts}
+
+RULES:
+- Keep every distinct finding and merge duplicates
+- Re-rank recommendations by priority across all parts
+- Mark hypotheses as hypotheses
+
+Use clear markdown: ## headers, **bold** critical items, bullet points. Be specific and actionable."""
+
+
 class Qwen3VLProvider(ILLMProvider):
     
     def __init__(self):
         self.base_url = None
         self.model = None
+        self.keep_alive = None
+        self.temperature: Optional[float] = None
+        self.extraction_temperature: Optional[float] = None
         self.config = {}
+        self.client: Optional[Union[OllamaClient, OllamaBackendPool]] = None
+        self.cache: Optional[ResponseCache] = None
+        self.token_budget = 6000
+        self.map_concurrency = 4
+        self.reuse_context = False
+        self.preprocessor = ImagePreprocessor()
     
     @property
     def name(self) -> str:
@@ -25,53 +113,155 @@ class Qwen3VLProvider(ILLMProvider):
     
     def initialize(self, config: Dict[str, Any]) -> None:
         self.config = config
-        self.base_url = os.getenv('OLLAMA_BASE_URL', config.get('base_url'))
+        self.client = create_ollama_client(config)
+        self.base_url = self.client.base_url
         self.model = os.getenv('QWEN3_VL_MODEL', config.get('model', 'qwen3-vl:8b'))
+        self.preprocessor = ImagePreprocessor(config.get('preprocess'))
+        self.keep_alive = config.get('keep_alive')
+        self.temperature = config.get('temperature')
+        self.extraction_temperature = config.get('extraction_temperature')
+        self.cache = ResponseCache.from_config(config.get('cache'))
+        self.token_budget = config.get('token_budget', 6000)
+        self.map_concurrency = config.get('map_concurrency', 4)
+        self.reuse_context = config.get('reuse_context', False)
         logger.info(f"Qwen3VL provider initialized: {self.base_url}, model: {self.model}")
+        get_residency().register(self.client, self.model, self.keep_alive, config.get('warm_up', True))
     
     def cleanup(self) -> None:
-        pass
+        if self.client:
+            self.client.close()
     
     def health_check(self) -> bool:
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        return self.client is not None and self.client.health_check()
+    
+    def _prepare_image(self, image: ImageSource) -> PreparedImage:
+        if isinstance(image, ImageHandle):
+            return image.prepare(self.preprocessor)
+        return self.preprocessor.prepare(image)
+    
+    def _build_payload(self, prompt: str, image: Optional[ImageSource] = None,
+                       **kwargs) -> Tuple[Dict[str, Any], Optional[PreparedImage]]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False
+        }
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        
+        prepared = self._encode_image(image) if image is not None else None
+        if prepared is not None:
+            payload['images'] = [prepared.encode()]
+        
+        self._apply_options(payload, kwargs)
+        return payload, prepared
+    
+    def _build_chat_payload(self, turns: List[Tuple[str, str]], image: ImageSource,
+                            **kwargs) -> Tuple[Dict[str, Any], PreparedImage]:
+        # The image rides on the first turn so every call of a conversation shares the same prefix
+        messages = [{'role': role, 'content': content} for role, content in turns]
+        prepared = self._encode_image(image)
+        messages[0]['images'] = [prepared.encode()]
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        }
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        
+        self._apply_options(payload, kwargs)
+        return payload, prepared
+    
+    def _encode_image(self, image: ImageSource) -> PreparedImage:
+        if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
+            raise FileNotFoundError(f"Image not found: {image}")
+        
+        prepared = self._prepare_image(image)
+        image_base64 = prepared.encode()
+        logger.info(f"Image encoded: {len(image_base64)} chars ({prepared.original_bytes} -> {prepared.sent_bytes} bytes)")
+        return prepared
+    
+    def _apply_options(self, payload: Dict[str, Any], kwargs: Dict[str, Any]) -> None:
+        # Unset leaves sampling to the server's defaults
+        temperature = kwargs.get('temperature', self.temperature)
+        if temperature is not None:
+            payload['options'] = {'temperature': temperature}
+    
+    def _to_response(self, result: Dict[str, Any], image: Optional[PreparedImage] = None) -> LLMResponse:
+        metadata = {
+            'model': self.model,
+            'provider': 'qwen3-vl',
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'completion_tokens': result.get('eval_count', 0),
+            'load_seconds': round(result.get('load_duration', 0) / 1e9, 3)
+        }
+        if image is not None:
+            metadata['with_image'] = True
+            # A cached response sent nothing to the model
+            if not result.get('cached'):
+                metadata['image'] = image.stats()
+        if result.get('cached'):
+            metadata['cached'] = True
+        
+        return LLMResponse(
+            text=result.get('response', ''),
+            tokens_used=result.get('eval_count', 0),
+            metadata=metadata
+        )
+    
+    def _lookup(self, payload: Dict[str, Any], kwargs: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if self.cache is None or not kwargs.get('use_cache', True):
+            return None, None
+        
+        key, cached = self.cache.lookup(payload)
+        if cached is not None:
+            on_token = kwargs.get('on_token')
+            if on_token is not None and cached.get('response'):
+                on_token(cached['response'])
+            return key, {**cached, 'cached': True}
+        return key, None
+    
+    def _store(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        # Token counts and timings describe the original call, not a replay of it
+        if key is not None and result.get('done', True):
+            self.cache.put(key, {'response': result.get('response', '')})
     
-    def _encode_image(self, image_path: str) -> str:
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+    def _call(self, payload: Dict[str, Any], kwargs: Dict[str, Any],
+              send: Optional[Callable[..., Dict[str, Any]]] = None) -> Dict[str, Any]:
+        key, cached = self._lookup(payload, kwargs)
+        if cached is not None:
+            return cached
+        
+        send = send or self.client.generate
+        result = send(payload, timeout=kwargs.get('timeout'), on_token=kwargs.get('on_token'))
+        self._store(key, result)
+        return result
+    
+    async def _call_async(self, payload: Dict[str, Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        key, cached = self._lookup(payload, kwargs)
+        if cached is not None:
+            return cached
+        
+        result = await self.client.generate_async(payload, timeout=kwargs.get('timeout'))
+        self._store(key, result)
+        return result
     
     def generate(self, prompt: str, **kwargs) -> LLMResponse:
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False
-            }
-            
-            if 'temperature' in kwargs:
-                payload['options'] = {'temperature': kwargs['temperature']}
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            return LLMResponse(
-                text=result.get('response', ''),
-                tokens_used=result.get('eval_count', 0),
-                metadata={
-                    'model': self.model,
-                    'provider': 'qwen3-vl',
-                    'prompt_tokens': result.get('prompt_eval_count', 0),
-                    'completion_tokens': result.get('eval_count', 0)
-                }
-            )
+            payload, _ = self._build_payload(prompt, **kwargs)
+            result = self._call(payload, kwargs)
+            return self._to_response(result)
+        except Exception as e:
+            logger.error(f"Qwen3VL generation failed: {str(e)}")
+            raise
+    
+    async def generate_async(self, prompt: str, **kwargs) -> LLMResponse:
+        try:
+            payload, _ = self._build_payload(prompt, **kwargs)
+            result = await self._call_async(payload, kwargs)
+            return self._to_response(result)
         except Exception as e:
             logger.error(f"Qwen3VL generation failed: {str(e)}")
             raise
@@ -80,53 +270,53 @@ class Qwen3VLProvider(ILLMProvider):
         prompt = "\n".join([f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages])
         return self.generate(prompt, **kwargs)
     
-    def generate_with_image(self, prompt: str, image_path: str, **kwargs) -> LLMResponse:
+    def generate_with_image(self, prompt: str, image: ImageSource, **kwargs) -> LLMResponse:
         try:
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image not found: {image_path}")
+            payload, prepared = self._build_payload(prompt, image, **kwargs)
             
-            image_base64 = self._encode_image(image_path)
-            logger.info(f"Image encoded: {len(image_base64)} chars")
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "images": [image_base64],
-                "stream": False
-            }
+            logger.info(f"Calling Ollama: {self.base_url}/api/generate with {self.model}")
+            result = self._call(payload, kwargs)
+            logger.info(f"Ollama response length: {len(result.get('response', ''))} chars")
             
-            if 'temperature' in kwargs:
-                payload['options'] = {'temperature': kwargs['temperature']}
+            return self._to_response(result, prepared)
+        except Exception as e:
+            logger.error(f"Qwen3VL image generation failed: {str(e)}")
+            raise
+    
+    async def generate_with_image_async(self, prompt: str, image: ImageSource, **kwargs) -> LLMResponse:
+        try:
+            payload, prepared = self._build_payload(prompt, image, **kwargs)
             
             logger.info(f"Calling Ollama: {self.base_url}/api/generate with {self.model}")
+            result = await self._call_async(payload, kwargs)
+            logger.info(f"Ollama response length: {len(result.get('response', ''))} chars")
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            response_text = result.get('response', '')
+            return self._to_response(result, prepared)
+        except Exception as e:
+            logger.error(f"Qwen3VL image generation failed: {str(e)}")
+            raise
+    
+    def _extraction_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Extraction and integration only transcribe, so they may run greedy (and be cached);
+        # the analysis pass keeps the sampling settings
+        if self.extraction_temperature is None:
+            return kwargs
+        return {'temperature': self.extraction_temperature, **kwargs}
+    
+    def _chat_with_image(self, turns: List[Tuple[str, str]], image: ImageSource, **kwargs) -> LLMResponse:
+        try:
+            payload, prepared = self._build_chat_payload(turns, image, **kwargs)
             
-            logger.info(f"Ollama response length: {len(response_text)} chars")
+            logger.info(f"Calling Ollama: {self.base_url}/api/chat with {self.model} ({len(turns)} turns)")
+            result = self._call(payload, kwargs, self.client.chat)
+            logger.info(f"Ollama response length: {len(result.get('response', ''))} chars")
             
-            return LLMResponse(
-                text=response_text,
-                tokens_used=result.get('eval_count', 0),
-                metadata={
-                    'model': self.model,
-                    'provider': 'qwen3-vl',
-                    'with_image': True,
-                    'prompt_tokens': result.get('prompt_eval_count', 0),
-                    'completion_tokens': result.get('eval_count', 0)
-                }
-            )
+            return self._to_response(result, prepared)
         except Exception as e:
-            logger.error(f"Qwen3VL image generation failed: {str(e)}")
+            logger.error(f"Qwen3VL image chat failed: {str(e)}")
             raise
     
-    def detect_visual_elements(self, image_path: str, **kwargs) -> LLMResponse:
+    def detect_visual_elements(self, image: ImageSource, **kwargs) -> LLMResponse:
         prompt = """Describe all non-text visual elements you see:
 
 - Buttons, switches, controls (positions, states)
@@ -137,9 +327,9 @@ class Qwen3VLProvider(ILLMProvider):
 
 Be factual and specific. Report only what you see."""
         
-        return self.generate_with_image(prompt, image_path, **kwargs)
+        return self.generate_with_image(prompt, image, **self._extraction_kwargs(kwargs))
     
-    def integrate_results(self, image_path: str, visual_elements: str, ocr_text: str, **kwargs) -> LLMResponse:
+    def integrate_results(self, image: ImageSource, visual_elements: str, ocr_text: str, **kwargs) -> LLMResponse:
         prompt = f"""Merge the following data into one structured document:
 
 VISUAL ELEMENTS:
@@ -161,10 +351,91 @@ STRICT RULES:
 OUTPUT:
 Complete document with all visual and text data organized clearly. NO additional commentary."""
         
-        return self.generate_with_image(prompt, image_path, **kwargs)
+        return self.generate_with_image(prompt, image, **self._extraction_kwargs(kwargs))
+    
+    def _over_budget(self, prompt: str) -> bool:
+        return bool(self.token_budget) and estimate_tokens(prompt) > self.token_budget
+    
+    def _section_budget(self, overhead: int) -> int:
+        # Room left for the variable part of a prompt, with a floor so huge fixed parts still make progress
+        return max(self.token_budget - overhead, self.token_budget // 4)
+    
+    def _generate_all(self, prompts: List[str], **kwargs) -> List[LLMResponse]:
+        if len(prompts) == 1:
+            return [self.generate(prompts[0], **kwargs)]
+        with ThreadPoolExecutor(max_workers=min(self.map_concurrency, len(prompts))) as executor:
+            return list(executor.map(lambda prompt: self.generate(prompt, **kwargs), prompts))
+    
+    def _map_reduce(self, prompts: List[str], merge_prompt: str, input_tokens: int, **kwargs) -> LLMResponse:
+        # Only the call that produces the final text is streamed
+        on_token = kwargs.pop('on_token', None)
+        
+        calls = self._generate_all(prompts, **kwargs)
+        texts = [response.text for response in calls]
+        merge_budget = self._section_budget(estimate_tokens(merge_prompt.format(parts='')))
+        streamed = False
+        
+        while len(texts) > 1:
+            groups = pack(texts, merge_budget)
+            if len(groups) == len(texts):
+                # No two parts fit one merge call; keep them in order
+                break
+            
+            merge_prompts = [merge_prompt.format(parts=self._join_parts(group)) for group in groups]
+            if len(merge_prompts) == 1:
+                merged = [self.generate(merge_prompts[0], on_token=on_token, **kwargs)]
+                streamed = on_token is not None
+            else:
+                merged = self._generate_all(merge_prompts, **kwargs)
+            calls.extend(merged)
+            texts = [response.text for response in merged]
+        
+        text = '\n\n'.join(texts)
+        if on_token is not None and not streamed:
+            on_token(text)
+        
+        return LLMResponse(
+            text=text,
+            tokens_used=sum(response.tokens_used for response in calls),
+            metadata={
+                'model': self.model,
+                'provider': 'qwen3-vl',
+                'map_reduce': {
+                    'input_tokens_estimate': input_tokens,
+                    'sections': len(prompts),
+                    'calls': len(calls)
+                },
+                'prompt_tokens': sum(response.metadata.get('prompt_tokens', 0) for response in calls),
+                'completion_tokens': sum(response.metadata.get('completion_tokens', 0) for response in calls),
+                'load_seconds': sum(response.metadata.get('load_seconds', 0.0) for response in calls)
+            }
+        )
+    
+    @staticmethod
+    def _join_parts(texts: List[str]) -> str:
+        return '\n\n'.join(f"--- PART {index} ---\n{text}" for index, text in enumerate(texts, 1))
     
     def integrate_results_text_only(self, visual_elements: str, ocr_text: str, **kwargs) -> LLMResponse:
-        prompt = f"""Merge these two data sources into one markdown document:
+        kwargs = self._extraction_kwargs(kwargs)
+        prompt = self._integration_prompt(visual_elements, ocr_text)
+        if not self._over_budget(prompt):
+            return self.generate(prompt, **kwargs)
+        
+        # Each section is integrated with the full visual description, then the parts are merged
+        input_tokens = estimate_tokens(prompt)
+        overhead = estimate_tokens(self._integration_prompt(visual_elements, ''))
+        sections = split_by_tokens(ocr_text, self._section_budget(overhead))
+        logger.info(f"Integration input of ~{input_tokens} tokens split into {len(sections)} sections")
+        
+        return self._map_reduce(
+            [self._integration_prompt(visual_elements, section) for section in sections],
+            MERGE_DOCUMENTS_PROMPT,
+            input_tokens,
+            **kwargs
+        )
+    
+    def _integration_prompt(self, visual_elements: str, ocr_text: str) -> str:
+        return f"""Merge these two data sources into one markdown document:
 
 VISUAL ELEMENTS:
 {visual_elements}
@@ -178,76 +449,86 @@ FORMAT:
 - Use bullets for lists
 - Combine and organize all information
 - NO analysis or commentary"""
-        
-        return self.generate(prompt, **kwargs)
     
-    def structure_blocks(self, image_path: str, blocks: list, **kwargs) -> LLMResponse:
+    def analyze_context(self, image: ImageSource, ocr_text: str, **kwargs) -> LLMResponse:
+        return self.generate_with_image(self._extraction_prompt(ocr_text), image, **self._extraction_kwargs(kwargs))
+    
+    def _extraction_prompt(self, ocr_text: str) -> str:
+        return f"""Extract ALL information from this image into one markdown document.
+
+OCR TEXT (reference for exact values):
+{ocr_text}
+
+STRICT RULES:
+- Include every label, value, unit and timestamp shown
+- Use the OCR text to confirm exact numbers and spelling
+- Include visual indicators (switch positions, lamp colors, gauge levels)
+- Use markdown headers (##, ###) and tables for structured data
+- DO NOT add any analysis, interpretation, or commentary
+
+OUTPUT:
+Complete extraction of the image data. NO additional commentary."""
+    
+    def structure_blocks(self, image: ImageSource, blocks: list, **kwargs) -> LLMResponse:
         import json
         
         full_text = "\n".join([b.get('text', '') for b in blocks if b.get('text')])
         
+        # Only the final pass is streamed to the caller
+        on_token = kwargs.pop('on_token', None)
+        
         logger.info("Thinking mode: Pass 1 - Full extraction")
-        pass1_response = self.analyze_context(image_path, full_text, **kwargs)
+        extraction_prompt = self._extraction_prompt(full_text)
+        pass1_start = time.time()
+        if self.reuse_context:
+            # Pass 1 opens a conversation that pass 2 continues, so the server can reuse its prefix
+            pass1_response = self._chat_with_image([('user', extraction_prompt)], image, **self._extraction_kwargs(kwargs))
+        else:
+            pass1_response = self.generate_with_image(extraction_prompt, image, **self._extraction_kwargs(kwargs))
+        pass1_seconds = time.time() - pass1_start
         
         logger.info("Thinking mode: Pass 2 - Operational analysis")
         
-        pass2_prompt = f"""Provide EXPERT-LEVEL analysis of this extracted data:
-
-{pass1_response.text}
-
-## 1. DATA VALIDATION & QUALITY
-- Completeness: missing fields, truncated data, unclear values
-- Consistency: mismatched values, logical errors, formatting issues
-- Anomalies: unusual patterns, out-of-range values, unexpected data
-- OCR errors or ambiguities
-
-## 2. CAUSE-EFFECT ANALYSIS
-For each anomaly or unusual pattern:
-- **Identify the effect** (what is abnormal)
-- **Analyze control responses** (what actions system is taking)
-- **Explain the cause** (why this is happening)
-- Example: "Valve 100% + Heat Exchanger 51.4°C but Bath only 29°C 
-           → System actively heating but insufficient heat delivery 
-           → Possible causes: high heat loss, circulation issue, recent water change"
-
-For environmental factors:
-- Connect external conditions to system behavior
-- Example: "-10.2°C outdoor → Rapid heat loss in open-air baths 
-           → System compensating with higher temps (43.9°C vs 42°C target)"
-
-## 3. OPERATIONAL STATE ASSESSMENT
-- Evaluate if control actions match targets
-- Identify stuck/failed vs correctly operating components
-- Example: "0% valve with 43.9°C bath (target 42°C) = CORRECT (no heating needed), 
-           NOT a malfunction"
-- Assess system efficiency and performance
-
-## 4. CONTEXTUAL INTELLIGENCE
-- Domain-specific insights (safety, efficiency, operational norms)
-- Time-based patterns and their implications
-- Priority assessment (Critical/Important/Monitor)
-- Safety threshold implications
-
-## 5. EXPERT RECOMMENDATIONS
-**Critical (Immediate Action):**
-- Issues requiring urgent attention
-- Safety concerns
-
-**Important (Near-term):**
-- Performance optimization
-- Preventive measures
-
-**Monitoring (Track):**
-- Trends to watch
-- Normal variation vs developing issues
-
-**Root Cause Hypotheses:**
-- Clearly mark as hypotheses
-- Suggest verification steps
-
-Use clear markdown: ## headers, **bold** critical items, bullet points. Be specific and actionable."""
-
-        pass2_response = self.generate(pass2_prompt, **kwargs)
+        full_prompt = f"Provide EXPERT-LEVEL analysis of this extracted data:\n\n{pass1_response.text}\n\n" + ANALYSIS_INSTRUCTIONS
+        # An extraction too large for one call is analyzed in sections; the conversation would hold all of it
+        chunked = self._over_budget(full_prompt)
+        
+        pass2_start = time.time()
+        if chunked:
+            approach = 'map_reduce'
+            input_tokens = estimate_tokens(full_prompt)
+            sections = split_by_tokens(pass1_response.text, self._section_budget(estimate_tokens(ANALYSIS_INSTRUCTIONS) + 32))
+            logger.info(f"Pass 2 input of ~{input_tokens} tokens split into {len(sections)} sections")
+            pass2_response = self._map_reduce(
+                [
+                    f"Provide EXPERT-LEVEL analysis of this part ({index} of {len(sections)}) of the extracted data:\n\n{section}\n\n" + ANALYSIS_INSTRUCTIONS
+                    for index, section in enumerate(sections, 1)
+                ],
+                MERGE_ANALYSES_PROMPT,
+                input_tokens,
+                on_token=on_token,
+                **kwargs
+            )
+        elif self.reuse_context:
+            approach = 'chat'
+            turns = [
+                ('user', extraction_prompt),
+                ('assistant', pass1_response.text),
+                ('user', "Provide EXPERT-LEVEL analysis of the data you extracted above:\n\n" + ANALYSIS_INSTRUCTIONS)
+            ]
+            pass2_response = self._chat_with_image(turns, image, on_token=on_token, **kwargs)
+        else:
+            approach = 'resend'
+            pass2_response = self.generate(full_prompt, on_token=on_token, **kwargs)
+        pass2_seconds = time.time() - pass2_start
+        
+        # Counts as reported by the server; on a chat continuation prompt_tokens only covers what
+        # was not served from pass 1's cached prefix. Cached responses report no tokens.
+        pass2_prefill = {
+            'approach': approach,
+            'pass1_prompt_tokens': pass1_response.metadata.get('prompt_tokens', 0),
+            'prompt_tokens': pass2_response.metadata.get('prompt_tokens', 0)
+        }
         
         total_tokens = pass1_response.tokens_used + pass2_response.tokens_used
         
@@ -260,6 +541,19 @@ Use clear markdown: ## headers, **bold** critical items, bullet points. Be speci
                 'mode': 'two-pass-thinking',
                 'pass1_tokens': pass1_response.tokens_used,
                 'pass2_tokens': pass2_response.tokens_used,
+                'pass1_seconds': round(pass1_seconds, 3),
+                'pass2_seconds': round(pass2_seconds, 3),
+                'pass2_prefill': pass2_prefill,
+                'pass2_map_reduce': pass2_response.metadata.get('map_reduce'),
+                'prompt_tokens': (
+                    pass1_response.metadata.get('prompt_tokens', 0) +
+                    pass2_response.metadata.get('prompt_tokens', 0)
+                ),
+                'completion_tokens': total_tokens,
+                'load_seconds': (
+                    pass1_response.metadata.get('load_seconds', 0.0) +
+                    pass2_response.metadata.get('load_seconds', 0.0)
+                ),
                 'pass1_extraction': pass1_response.text
             }
         )
@@ -0,0 +1,68 @@
+from typing import List
+import math
+import re
+
+# Kana, CJK ideographs, Hangul and full-width forms mostly cost a token per character
+WIDE_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+DIGIT_PATTERN = re.compile(r'\d')
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # Qwen tokenizes digits one by one; other text averages about four characters a token
+    if not text:
+        return 0
+    wide = len(WIDE_PATTERN.findall(text))
+    digits = len(DIGIT_PATTERN.findall(text))
+    return wide + digits + math.ceil((len(text) - wide - digits) / CHARS_PER_TOKEN)
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    # Paragraphs are kept whole where possible so tables and lists are not cut in half
+    pieces: List[str] = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        if not paragraph.strip():
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        lines: List[str] = []
+        for line in paragraph.splitlines():
+            while estimate_tokens(line) > max_tokens:
+                cut = _cut_point(line, max_tokens)
+                lines.append(line[:cut])
+                line = line[cut:]
+            if line.strip():
+                lines.append(line)
+        pieces.extend('\n'.join(group) for group in pack(lines, max_tokens))
+    
+    return ['\n\n'.join(group) for group in pack(pieces, max_tokens)]
+
+
+def pack(texts: List[str], max_tokens: int) -> List[List[str]]:
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        # One more for the separator the group is joined with
+        tokens = estimate_tokens(text) + 1
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _cut_point(line: str, max_tokens: int) -> int:
+    # Longest prefix that fits, found by bisection since the estimate is monotonic
+    low, high = 1, len(line)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(line[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -1,4 +1,5 @@
 from .interface import IOCREngine, OCRResult
 from .processor import OCRProcessor
+from .cache import ResultCache
 
-__all__ = ['IOCREngine', 'OCRResult', 'OCRProcessor']
+__all__ = ['IOCREngine', 'OCRResult', 'OCRProcessor', 'ResultCache']
@@ -0,0 +1,95 @@
+from modules.ocr.interface import OCRResult
+from modules.common.disk_cache import DiskLRU
+from core.metrics import CACHE_LOOKUPS
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResultCache:
+    
+    def __init__(self, memory_entries: int = 256, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = DiskLRU(disk_dir, disk_max_bytes, "Result cache") if disk_dir else None
+        
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['ResultCache']:
+        if not config.get('enabled', True):
+            return None
+        return cls(
+            memory_entries=config.get('memory_entries', 256),
+            disk_dir=config.get('disk_dir'),
+            disk_max_bytes=int(config.get('disk_max_mb', 512) * 1024 * 1024)
+        )
+    
+    @staticmethod
+    def make_key(digest: str, mode: str, models: Dict[str, Any], prompt_version: str) -> str:
+        key_data = json.dumps({
+            'content': digest,
+            'mode': mode,
+            'models': models,
+            'prompt_version': prompt_version
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Tuple[Optional[OCRResult], Optional[str]]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits['memory'] += 1
+                CACHE_LOOKUPS.labels(result='memory_hit').inc()
+                return OCRResult(**json.loads(data)), 'memory'
+        
+        data = self._disk.get(key) if self._disk else None
+        with self._lock:
+            if data is not None:
+                self.hits['disk'] += 1
+                CACHE_LOOKUPS.labels(result='disk_hit').inc()
+                self._put_memory(key, data)
+                return OCRResult(**json.loads(data)), 'disk'
+            
+            self.misses += 1
+            CACHE_LOOKUPS.labels(result='miss').inc()
+            return None, None
+    
+    def put(self, key: str, result: OCRResult) -> None:
+        data = json.dumps(asdict(result), ensure_ascii=False, default=str)
+        with self._lock:
+            self._put_memory(key, data)
+        if self._disk:
+            self._disk.put(key, data)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': dict(self.hits),
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'disk_entries': self._disk.entries if self._disk else 0,
+                'disk_bytes': self._disk.bytes if self._disk else 0
+            }
+    
+    def _put_memory(self, key: str, data: str) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
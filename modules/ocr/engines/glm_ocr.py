@@ -1,19 +1,32 @@
 from modules.ocr.interface import IOCREngine, OCRResult
-from typing import Dict, Any, List
+from modules.common.ollama import OllamaClient, OllamaBackendPool, create_ollama_client
+from modules.common.residency import get_residency
+from modules.common.image import ImageSource, ImageHandle, ImagePreprocessor, PreparedImage, describe_source
+from typing import Dict, Any, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import requests
-import base64
+import json
 import os
 
 logger = logging.getLogger(__name__)
 
 
+PROMPT_MAP = {
+    "text": "Text Recognition:",
+    "formula": "Formula Recognition:",
+    "table": "Table Recognition:"
+}
+
+
 class GLMOCREngine(IOCREngine):
     
     def __init__(self):
         self.base_url = None
         self.model = None
+        self.keep_alive = None
         self.config = {}
+        self.client: Optional[Union[OllamaClient, OllamaBackendPool]] = None
+        self.preprocessor = ImagePreprocessor()
     
     @property
     def name(self) -> str:
@@ -25,119 +38,137 @@ class GLMOCREngine(IOCREngine):
     
     def initialize(self, config: Dict[str, Any]) -> None:
         self.config = config
-        self.base_url = os.getenv('OLLAMA_BASE_URL', config.get('base_url'))
+        self.client = create_ollama_client(config)
+        self.base_url = self.client.base_url
         self.model = os.getenv('GLM_OCR_MODEL', config.get('model'))
+        self.preprocessor = ImagePreprocessor(config.get('preprocess'))
+        self.keep_alive = config.get('keep_alive')
         logger.info(f"GLM-OCR engine initialized: {self.base_url}")
+        get_residency().register(self.client, self.model, self.keep_alive, config.get('warm_up', True))
     
     def cleanup(self) -> None:
-        pass
+        if self.client:
+            self.client.close()
     
     def health_check(self) -> bool:
+        return self.client is not None and self.client.health_check()
+    
+    def _prepare_image(self, source: ImageSource) -> PreparedImage:
+        if isinstance(source, ImageHandle):
+            return source.prepare(self.preprocessor)
+        return self.preprocessor.prepare(source)
+    
+    def _build_payload(self, source: ImageSource, prompt: str) -> Tuple[Dict[str, Any], PreparedImage]:
+        image = self._prepare_image(source)
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "images": [image.encode()],
+            "stream": False
+        }
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        return payload, image
+    
+    def _text_result(self, result: Dict[str, Any], task: str, image: PreparedImage) -> OCRResult:
+        return OCRResult(
+            text=result.get('response', ''),
+            boxes=[],
+            confidence=0.9,
+            metadata={
+                'engine': 'glm-ocr',
+                'task': task,
+                'model': self.model,
+                'prompt_tokens': result.get('prompt_eval_count', 0),
+                'completion_tokens': result.get('eval_count', 0),
+                'load_seconds': round(result.get('load_duration', 0) / 1e9, 3),
+                'image': image.stats()
+            }
+        )
+    
+    def _schema_result(self, result: Dict[str, Any], image: PreparedImage) -> OCRResult:
+        text = result.get('response', '')
+        
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
+            structured_data = json.loads(text)
         except:
-            return False
+            structured_data = None
+        
+        return OCRResult(
+            text=text,
+            boxes=[],
+            confidence=0.9,
+            metadata={
+                'engine': 'glm-ocr',
+                'task': 'structured_extraction',
+                'model': self.model,
+                'structured_data': structured_data,
+                'load_seconds': round(result.get('load_duration', 0) / 1e9, 3),
+                'image': image.stats()
+            }
+        )
     
-    def _encode_image(self, image_path: str) -> str:
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+    def _schema_prompt(self, schema: Dict[str, Any]) -> str:
+        return f"Please output the information in the image according to the following JSON format:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
     
-    def process(self, input_path: str, task: str = "text", **kwargs) -> OCRResult:
+    def process(self, source: ImageSource, task: str = "text", **kwargs) -> OCRResult:
         try:
-            image_base64 = self._encode_image(input_path)
-            
-            prompt_map = {
-                "text": "Text Recognition:",
-                "formula": "Formula Recognition:",
-                "table": "Table Recognition:"
-            }
-            prompt = prompt_map.get(task, "Text Recognition:")
+            prompt = PROMPT_MAP.get(task, "Text Recognition:")
+            payload, image = self._build_payload(source, prompt)
             
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "images": [image_base64],
-                "stream": False
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            text = result.get('response', '')
-            
-            return OCRResult(
-                text=text,
-                boxes=[],
-                confidence=0.9,
-                metadata={
-                    'engine': 'glm-ocr',
-                    'task': task,
-                    'model': self.model
-                }
-            )
+            result = self.client.generate(payload, timeout=kwargs.get('timeout'))
+            return self._text_result(result, task, image)
         except Exception as e:
             logger.error(f"GLM-OCR processing failed: {str(e)}")
             raise
     
-    def process_with_schema(self, input_path: str, schema: Dict[str, Any]) -> OCRResult:
+    async def process_async(self, source: ImageSource, task: str = "text", **kwargs) -> OCRResult:
         try:
-            image_base64 = self._encode_image(input_path)
-            
-            import json
-            prompt = f"Please output the information in the image according to the following JSON format:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "images": [image_base64],
-                "stream": False
-            }
+            prompt = PROMPT_MAP.get(task, "Text Recognition:")
+            payload, image = self._build_payload(source, prompt)
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            text = result.get('response', '')
+            result = await self.client.generate_async(payload, timeout=kwargs.get('timeout'))
+            return self._text_result(result, task, image)
+        except Exception as e:
+            logger.error(f"GLM-OCR processing failed: {str(e)}")
+            raise
+    
+    def process_with_schema(self, source: ImageSource, schema: Dict[str, Any]) -> OCRResult:
+        try:
+            payload, image = self._build_payload(source, self._schema_prompt(schema))
             
-            try:
-                structured_data = json.loads(text)
-            except:
-                structured_data = None
+            result = self.client.generate(payload)
+            return self._schema_result(result, image)
+        except Exception as e:
+            logger.error(f"GLM-OCR structured extraction failed: {str(e)}")
+            raise
+    
+    async def process_with_schema_async(self, source: ImageSource, schema: Dict[str, Any]) -> OCRResult:
+        try:
+            payload, image = self._build_payload(source, self._schema_prompt(schema))
             
-            return OCRResult(
-                text=text,
-                boxes=[],
-                confidence=0.9,
-                metadata={
-                    'engine': 'glm-ocr',
-                    'task': 'structured_extraction',
-                    'model': self.model,
-                    'structured_data': structured_data
-                }
-            )
+            result = await self.client.generate_async(payload)
+            return self._schema_result(result, image)
         except Exception as e:
             logger.error(f"GLM-OCR structured extraction failed: {str(e)}")
             raise
     
-    def batch_process(self, input_paths: List[str], **kwargs) -> List[OCRResult]:
-        results = []
-        for path in input_paths:
-            try:
-                result = self.process(path, **kwargs)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to process {path}: {str(e)}")
-                results.append(OCRResult(
-                    text="",
-                    confidence=0.0,
-                    metadata={'error': str(e)}
-                ))
-        return results
+    def _process_or_error(self, source: ImageSource, **kwargs) -> OCRResult:
+        try:
+            return self.process(source, **kwargs)
+        except Exception as e:
+            logger.error(f"Failed to process {describe_source(source)}: {str(e)}")
+            return OCRResult(
+                text="",
+                confidence=0.0,
+                metadata={'error': str(e)}
+            )
+    
+    def batch_process(self, sources: List[ImageSource], **kwargs) -> List[OCRResult]:
+        if not sources:
+            return []
+        
+        # Model calls are bounded by the shared call scheduler, not by this pool
+        max_workers = max(1, min(self.config.get('batch_concurrency', 8), len(sources)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda source: self._process_or_error(source, **kwargs), sources))
@@ -1,15 +1,125 @@
 from modules.ocr.interface import IOCREngine, OCRResult
-from typing import Dict, Any, List
+from modules.ocr.pdf import image_to_pdf, merge_pdfs, page_count
+from modules.common.image import ImageSource, ImageHandle, read_bytes, is_pdf, describe_source
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Union
 import logging
+import os
+import queue
+import tempfile
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _QueuedDocument:
+    pdf: bytes
+    pages: int
+    future: Future
+
+
+# Queued by close(); distinct from the None that "nothing carried over" means in _run
+_STOP = object()
+
+
+class MarkerBatcher:
+    
+    def __init__(self, convert, batch_size: int, window_seconds: float):
+        self.convert = convert
+        self.batch_size = batch_size
+        self.window_seconds = window_seconds
+        self._queue: "queue.Queue[Union[_QueuedDocument, object]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='marker-batcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, pdf: bytes) -> Future:
+        document = _QueuedDocument(pdf, page_count(pdf), Future())
+        self._queue.put(document)
+        return document.future
+    
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+    
+    def _run(self) -> None:
+        carry = None
+        while True:
+            first = carry if carry is not None else self._queue.get()
+            carry = None
+            if first is _STOP:
+                return
+            
+            batch = [first]
+            pages = first.pages
+            deadline = time.monotonic() + self.window_seconds
+            while pages < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    document = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                # Shutdown ends the window before the capacity test; it is picked up as the next first
+                if document is _STOP or pages + document.pages > self.batch_size:
+                    carry = document
+                    break
+                batch.append(document)
+                pages += document.pages
+            
+            self._convert_batch(batch)
+    
+    def _convert_batch(self, batch: List[_QueuedDocument]) -> None:
+        if len(batch) > 1:
+            try:
+                merged, page_counts = merge_pdfs([document.pdf for document in batch])
+                logger.info(f"Marker batch: {len(batch)} documents, {sum(page_counts)} pages")
+                parts = _split_rendered(self.convert(merged), page_counts)
+                if parts is not None:
+                    for document, part in zip(batch, parts):
+                        document.future.set_result(part)
+                    return
+            except Exception as e:
+                logger.warning(f"Marker batch of {len(batch)} documents failed, converting individually: {str(e)}")
+        
+        for document in batch:
+            try:
+                document.future.set_result(self.convert(document.pdf))
+            except Exception as e:
+                document.future.set_exception(e)
+
+
+def _split_rendered(rendered, page_counts: List[int]):
+    if isinstance(rendered, list):
+        pages = rendered
+    elif hasattr(rendered, 'children'):
+        pages = list(rendered.children)
+    else:
+        return None
+    
+    if len(pages) != sum(page_counts):
+        return None
+    
+    parts = []
+    offset = 0
+    for count in page_counts:
+        chunk = pages[offset:offset + count]
+        parts.append(chunk if isinstance(rendered, list) else SimpleNamespace(children=chunk))
+        offset += count
+    return parts
+
+
 class MarkerEngine(IOCREngine):
     
     def __init__(self):
         self._marker = None
         self.config = {}
+        self.batcher: Optional[MarkerBatcher] = None
     
     @property
     def name(self) -> str:
@@ -31,7 +141,9 @@ class MarkerEngine(IOCREngine):
             self.batch_size = config.get('batch_size', 1)
             
             marker_config = {
-                "output_format": "json"
+                "output_format": "json",
+                "layout_batch_size": self.batch_size,
+                "detection_batch_size": self.batch_size
             }
             
             config_parser = ConfigParser(marker_config)
@@ -43,6 +155,13 @@ class MarkerEngine(IOCREngine):
                 renderer=config_parser.get_renderer()
             )
             
+            if self.batch_size > 1:
+                self.batcher = MarkerBatcher(
+                    self._convert_bytes,
+                    self.batch_size,
+                    config.get('batch_window_ms', 50) / 1000
+                )
+            
             logger.info("Marker engine initialized successfully")
         except ImportError as e:
             logger.error(f"Failed to import Marker: {str(e)}")
@@ -52,6 +171,9 @@ class MarkerEngine(IOCREngine):
             raise
     
     def cleanup(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
         if hasattr(self, 'converter'):
             del self.converter
     
@@ -77,57 +199,105 @@ class MarkerEngine(IOCREngine):
                         import re
                         text = re.sub(r'<[^>]+>', '', html)
                         
-                        if text.strip():
-                            blocks.append({
-                                'bbox': bbox,
-                                'text': text,
-                                'type': block_type,
-                                'confidence': 0.95,
-                                'page': page_idx,
-                                'polygon': polygon
-                            })
-                            block_id += 1
+                        # Tables and equations often come back without text; the layout planner decides what to keep
+                        blocks.append({
+                            'bbox': bbox,
+                            'text': text,
+                            'type': block_type,
+                            'confidence': 0.95,
+                            'page': page_idx,
+                            'polygon': polygon
+                        })
+                        block_id += 1
         
         return blocks
     
-    def process(self, input_path: str, **kwargs) -> OCRResult:
+    def _convert(self, source: ImageSource):
+        if isinstance(source, ImageHandle) and isinstance(source.source, (str, os.PathLike)):
+            source = source.source
+        
+        if isinstance(source, (str, os.PathLike)):
+            return self.converter(str(source))
+        
+        return self._convert_bytes(read_bytes(source), '.pdf' if is_pdf(source) else '.png')
+    
+    def _convert_bytes(self, data: bytes, suffix: str = '.pdf'):
+        # Marker's document providers only read from a file path
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp.write(data)
+            tmp_path = tmp.name
         try:
-            rendered = self.converter(input_path)
-            
-            blocks = []
-            markdown_text = ""
-            
-            if isinstance(rendered, list):
-                blocks = self._extract_blocks_from_json(rendered)
-                
-                from marker.output import json_to_markdown
-                markdown_text = json_to_markdown(rendered)
-            elif hasattr(rendered, 'markdown'):
-                markdown_text = rendered.markdown
-            
-            return OCRResult(
-                text=markdown_text,
-                boxes=blocks,
-                confidence=1.0,
-                metadata={
-                    'engine': 'marker',
-                    'format': 'json',
-                    'pages': len(rendered) if isinstance(rendered, list) else 0,
-                    'blocks_count': len(blocks)
-                }
-            )
+            return self.converter(tmp_path)
+        finally:
+            os.unlink(tmp_path)
+    
+    def _submit(self, source: ImageSource) -> Future:
+        pdf = read_bytes(source) if is_pdf(source) else image_to_pdf(source)
+        return self.batcher.submit(pdf)
+    
+    def process(self, source: ImageSource, **kwargs) -> OCRResult:
+        try:
+            if self.batcher is not None:
+                rendered = self._submit(source).result()
+            else:
+                rendered = self._convert(source)
+            return self._to_result(rendered)
         except Exception as e:
             logger.error(f"Marker processing failed: {str(e)}")
             raise
     
-    def batch_process(self, input_paths: List[str], **kwargs) -> List[OCRResult]:
+    def _to_result(self, rendered) -> OCRResult:
+        blocks = []
+        markdown_text = ""
+        
+        if isinstance(rendered, list):
+            blocks = self._extract_blocks_from_json(rendered)
+            
+            from marker.output import json_to_markdown
+            markdown_text = json_to_markdown(rendered)
+        elif hasattr(rendered, 'children'):
+            pages = [
+                page.model_dump() if hasattr(page, 'model_dump') else page
+                for page in rendered.children
+            ]
+            blocks = self._extract_blocks_from_json(pages)
+            markdown_text = '\n\n'.join(block['text'] for block in blocks if block['text'].strip())
+        elif hasattr(rendered, 'markdown'):
+            markdown_text = rendered.markdown
+        
+        return OCRResult(
+            text=markdown_text,
+            boxes=blocks,
+            confidence=1.0,
+            metadata={
+                'engine': 'marker',
+                'format': 'json',
+                'pages': len(rendered) if isinstance(rendered, list) else len(getattr(rendered, 'children', [])),
+                'blocks_count': len(blocks)
+            }
+        )
+    
+    def batch_process(self, sources: List[ImageSource], **kwargs) -> List[OCRResult]:
+        if self.batcher is None:
+            outcomes = [partial(self.process, source, **kwargs) for source in sources]
+        else:
+            # Queue every document up front so the batcher can group their pages
+            outcomes = []
+            for source in sources:
+                try:
+                    future = self._submit(source)
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+                outcomes.append(lambda future=future: self._to_result(future.result()))
+        
         results = []
-        for path in input_paths:
+        for source, outcome in zip(sources, outcomes):
             try:
-                result = self.process(path, **kwargs)
+                result = outcome()
                 results.append(result)
             except Exception as e:
-                logger.error(f"Failed to process {path}: {str(e)}")
+                logger.error(f"Failed to process {describe_source(source)}: {str(e)}")
                 results.append(OCRResult(
                     text="",
                     confidence=0.0,
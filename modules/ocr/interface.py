@@ -2,6 +2,9 @@ from abc import abstractmethod
 from typing import List, Dict, Any
 from dataclasses import dataclass, field
 from core.plugin import IPlugin
+from modules.common.image import ImageSource
+import asyncio
+import functools
 
 
 @dataclass
@@ -15,9 +18,13 @@ class OCRResult:
 class IOCREngine(IPlugin):
     
     @abstractmethod
-    def process(self, input_path: str, **kwargs) -> OCRResult:
+    def process(self, source: ImageSource, **kwargs) -> OCRResult:
         pass
     
     @abstractmethod
-    def batch_process(self, input_paths: List[str], **kwargs) -> List[OCRResult]:
+    def batch_process(self, sources: List[ImageSource], **kwargs) -> List[OCRResult]:
         pass
+    
+    async def process_async(self, source: ImageSource, **kwargs) -> OCRResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.process, source, **kwargs))
@@ -1,18 +1,80 @@
-from typing import List, Dict, Any, Tuple
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Set, Tuple
 from PIL import Image
+from modules.common.image import ImageSource, open_image
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Marker block types that GLM-OCR has a dedicated task for; everything else is read as text
+TASK_BY_TYPE = {
+    'Table': 'table',
+    'TableGroup': 'table',
+    'Equation': 'formula'
+}
+
+DEFAULT_PLANNING_CONFIG = {
+    'merge_small_blocks': True,
+    'small_block_ratio': 0.01,   # blocks below this share of the page area are merge candidates
+    'merge_gap': 12,             # pixels between blocks that still count as adjacent
+    'max_region_ratio': 0.25,    # merged regions never grow beyond this share of the page
+    'overlap_tolerance': 0.1,    # share of another block a merged region may cover
+    'min_side': 4,               # blocks thinner than this are dropped
+    'grid_cell': 64
+}
+
+
+def _area(bbox: List[float]) -> float:
+    return max(0.0, bbox[2] - bbox[0]) * max(0.0, bbox[3] - bbox[1])
+
+
+def _union(a: List[float], b: List[float]) -> List[float]:
+    return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+
+def _intersection_area(a: List[float], b: List[float]) -> float:
+    return _area([max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])])
+
+
+class GridIndex:
+    
+    def __init__(self, cell_size: int = 64):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+    
+    def _cells_for(self, bbox: List[float]):
+        x1, y1 = int(bbox[0] // self.cell_size), int(bbox[1] // self.cell_size)
+        x2, y2 = int(bbox[2] // self.cell_size), int(bbox[3] // self.cell_size)
+        for x in range(x1, x2 + 1):
+            for y in range(y1, y2 + 1):
+                yield x, y
+    
+    def insert(self, key: int, bbox: List[float]) -> None:
+        for cell in self._cells_for(bbox):
+            self._cells[cell].add(key)
+    
+    def remove(self, key: int, bbox: List[float]) -> None:
+        for cell in self._cells_for(bbox):
+            self._cells[cell].discard(key)
+    
+    def query(self, bbox: List[float]) -> Set[int]:
+        # Candidates whose cells overlap the box; callers check the exact geometry
+        keys: Set[int] = set()
+        for cell in self._cells_for(bbox):
+            keys |= self._cells.get(cell, set())
+        return keys
+
+
 class LayoutProcessor:
     
-    def __init__(self, marker_engine):
+    def __init__(self, marker_engine, config: Optional[Dict[str, Any]] = None):
         self.marker = marker_engine
+        self.config = {**DEFAULT_PLANNING_CONFIG, **(config or {})}
     
-    def extract_layout_blocks(self, image_path: str) -> List[Dict[str, Any]]:
+    def extract_layout_blocks(self, source: ImageSource) -> List[Dict[str, Any]]:
         try:
-            marker_result = self.marker.process(image_path)
+            marker_result = self.marker.process(source)
             
             blocks = []
             if marker_result.boxes:
@@ -24,7 +86,8 @@ class LayoutProcessor:
                             'bbox': bbox,
                             'text': box_info.get('text', ''),
                             'confidence': box_info.get('confidence', 0.0),
-                            'type': box_info.get('type', 'text')
+                            'type': box_info.get('type', 'text'),
+                            'page': box_info.get('page', 0)
                         })
             
             logger.info(f"Extracted {len(blocks)} layout blocks")
@@ -34,9 +97,106 @@ class LayoutProcessor:
             logger.error(f"Layout extraction failed: {str(e)}")
             return []
     
-    def crop_image_block(self, image_path: str, bbox: List[int]) -> Image.Image:
+    def plan_blocks(self, blocks: List[Dict[str, Any]], page_size: Tuple[int, int]) -> List[Dict[str, Any]]:
+        width, height = page_size
+        # Zero-area boxes are dropped even when min_side is configured to 0
+        min_side = max(self.config['min_side'], 1)
+        
+        regions = []
+        for block in blocks:
+            x1, y1, x2, y2 = block['bbox']
+            bbox = [max(0, x1), max(0, y1), min(width, x2), min(height, y2)]
+            # Degenerate areas would only cost a model call. Text is not checked: Marker often leaves
+            # it empty for tables, figures and equations, which are exactly what GLM-OCR should read.
+            if bbox[2] - bbox[0] < min_side or bbox[3] - bbox[1] < min_side:
+                continue
+            block_type = block.get('type', 'text')
+            regions.append({
+                **block,
+                'bbox': bbox,
+                'task': TASK_BY_TYPE.get(block_type, 'text'),
+                'source_ids': [block['id']]
+            })
+        
+        planned = self._merge_regions(regions, width * height) if self.config['merge_small_blocks'] else regions
+        
+        for index, region in enumerate(planned):
+            region['id'] = index
+        
+        if len(planned) != len(blocks):
+            logger.info(f"Planned {len(planned)} regions from {len(blocks)} layout blocks")
+        return planned
+    
+    def _merge_regions(self, regions: List[Dict[str, Any]], page_area: float) -> List[Dict[str, Any]]:
+        small_area = page_area * self.config['small_block_ratio']
+        max_area = page_area * self.config['max_region_ratio']
+        gap = self.config['merge_gap']
+        tolerance = self.config['overlap_tolerance']
+        
+        index = GridIndex(self.config['grid_cell'])
+        for key, region in enumerate(regions):
+            index.insert(key, region['bbox'])
+        alive = set(range(len(regions)))
+        parts = {key: [(region['id'], region.get('text') or '')] for key, region in enumerate(regions)}
+        
+        # Regions are visited in Marker's reading order and absorb neighbours one at a time
+        for key, region in enumerate(regions):
+            if key not in alive or region['task'] != 'text':
+                continue
+            
+            while True:
+                bbox = region['bbox']
+                reach = [bbox[0] - gap, bbox[1] - gap, bbox[2] + gap, bbox[3] + gap]
+                candidates = sorted(
+                    other for other in index.query(reach)
+                    if other != key and other in alive and
+                    regions[other]['type'] == region['type'] and
+                    _intersection_area(reach, regions[other]['bbox']) > 0 and
+                    (_area(bbox) < small_area or _area(regions[other]['bbox']) < small_area)
+                )
+                
+                merged = None
+                for other in candidates:
+                    union = _union(bbox, regions[other]['bbox'])
+                    if _area(union) > max_area:
+                        continue
+                    # A merged crop must not swallow a block that is read separately
+                    covered = any(
+                        _intersection_area(union, regions[third]['bbox']) > tolerance * _area(regions[third]['bbox'])
+                        for third in index.query(union)
+                        if third not in (key, other) and third in alive
+                    )
+                    if not covered:
+                        merged = other
+                        break
+                
+                if merged is None:
+                    break
+                
+                other_region = regions[merged]
+                index.remove(key, bbox)
+                index.remove(merged, other_region['bbox'])
+                alive.discard(merged)
+                
+                region['bbox'] = _union(bbox, other_region['bbox'])
+                parts[key] += parts.pop(merged)
+                region['text'] = '\n'.join(text for _, text in sorted(parts[key]) if text)
+                region['confidence'] = min(region.get('confidence', 0.0), other_region.get('confidence', 0.0))
+                region['source_ids'] = sorted(region['source_ids'] + other_region['source_ids'])
+                index.insert(key, region['bbox'])
+        
+        return [region for key, region in enumerate(regions) if key in alive]
+    
+    def load_image(self, source: ImageSource) -> Image.Image:
+        image = open_image(source)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.load()
+        return image
+    
+    def crop_image_block(self, source: ImageSource, bbox: List[int]) -> Image.Image:
         try:
-            image = Image.open(image_path)
+            image = open_image(source)
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
@@ -48,11 +208,11 @@ class LayoutProcessor:
             logger.error(f"Image cropping failed: {str(e)}")
             raise
     
-    def save_cropped_block(self, image_path: str, bbox: List[int]) -> str:
+    def save_cropped_block(self, source: ImageSource, bbox: List[int]) -> str:
         import tempfile
         import os
         
-        cropped = self.crop_image_block(image_path, bbox)
+        cropped = self.crop_image_block(source, bbox)
         
         with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
             cropped.save(tmp.name, 'PNG')
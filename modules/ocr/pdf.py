@@ -0,0 +1,105 @@
+from modules.common.image import ImageSource, read_bytes, open_image
+from PIL import Image
+from typing import List, Optional, Tuple
+import io
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+POINTS_PER_INCH = 72
+
+# pdfium is not thread-safe, so every document access goes through this lock
+_pdfium_lock = threading.Lock()
+
+
+def _open_document(source: ImageSource):
+    import pypdfium2 as pdfium
+    return pdfium.PdfDocument(read_bytes(source))
+
+
+def page_count(source: ImageSource) -> int:
+    with _pdfium_lock:
+        pdf = _open_document(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+class PdfPages:
+    
+    def __init__(self, source: ImageSource, dpi: int = 150):
+        self.dpi = dpi
+        self.scale = dpi / POINTS_PER_INCH
+        with _pdfium_lock:
+            self._pdf = _open_document(source)
+            self.count = len(self._pdf)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __enter__(self) -> 'PdfPages':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def render(self, index: int) -> Image.Image:
+        # The lock is held for this page only, so other pages can be processed meanwhile
+        with _pdfium_lock:
+            page = self._pdf[index]
+            try:
+                image = page.render(scale=self.scale).to_pil()
+                if image.mode != 'RGB':
+                    image = image.convert('RGB')
+            finally:
+                page.close()
+        return image
+    
+    def close(self) -> None:
+        with _pdfium_lock:
+            self._pdf.close()
+
+
+def rasterize_pdf(source: ImageSource, dpi: int = 150, max_pages: Optional[int] = None) -> List[Image.Image]:
+    with PdfPages(source, dpi) as pdf:
+        count = len(pdf) if max_pages is None else min(len(pdf), max_pages)
+        pages = [pdf.render(index) for index in range(count)]
+    
+    logger.info(f"Rasterized {len(pages)} PDF pages at {dpi} DPI")
+    return pages
+
+
+def image_to_pdf(source: ImageSource) -> bytes:
+    image = open_image(source)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    # At 72 DPI one pixel maps to one PDF point, so page coordinates stay in pixels
+    buffer = io.BytesIO()
+    image.save(buffer, format='PDF', resolution=POINTS_PER_INCH)
+    return buffer.getvalue()
+
+
+def merge_pdfs(documents: List[bytes]) -> Tuple[bytes, List[int]]:
+    import pypdfium2 as pdfium
+    
+    page_counts = []
+    with _pdfium_lock:
+        merged = pdfium.PdfDocument.new()
+        try:
+            for data in documents:
+                pdf = pdfium.PdfDocument(data)
+                try:
+                    page_counts.append(len(pdf))
+                    merged.import_pages(pdf)
+                finally:
+                    pdf.close()
+            
+            buffer = io.BytesIO()
+            merged.save(buffer)
+        finally:
+            merged.close()
+    
+    return buffer.getvalue(), page_counts
@@ -1,50 +1,290 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from modules.ocr.interface import OCRResult
 from modules.ocr.layout import LayoutProcessor
-from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
+from modules.ocr.cache import ResultCache
+from modules.ocr.pdf import POINTS_PER_INCH, PdfPages, page_count, rasterize_pdf
+from modules.ocr.routing import ModeRouter
+from modules.ocr.runlog import get_run_log
+from modules.ocr.singleflight import SingleFlight, get_single_flight
+from core.metrics import StageTimer, REQUEST_SECONDS, ERRORS
+from modules.common.image import ImageSource, ImageHandle, is_pdf, describe_source
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime
 import logging
-import os
-import json
 import time
 
 logger = logging.getLogger(__name__)
 
+EventCallback = Callable[[str, Dict[str, Any]], None]
 
-def log_ocr_run(mode: str, input_path: str, result: OCRResult, execution_time: float):
-    os.makedirs('logs/ocr', exist_ok=True)
-    
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = f'logs/ocr/{mode}_{timestamp}.json'
-    
-    log_data = {
+# Bump whenever a prompt in the pipeline changes so cached results are not reused
+PROMPT_VERSION = "3"
+
+
+def log_ocr_run(mode: str, source: ImageSource, result: OCRResult, execution_time: float):
+    get_run_log().write({
         'timestamp': datetime.now().isoformat(),
         'mode': mode,
-        'input_path': input_path,
+        'input_path': describe_source(source),
         'execution_time_seconds': round(execution_time, 2),
         'result': {
             'text': result.text,
             'confidence': result.confidence,
             'metadata': result.metadata
         }
-    }
-    
-    with open(log_file, 'w', encoding='utf-8') as f:
-        json.dump(log_data, f, ensure_ascii=False, indent=2)
-    
-    logger.info(f"OCR run logged to: {log_file}")
+    })
 
 
 class OCRProcessor:
     
-    def __init__(self, ocr_engines: Dict[str, Any], llm_provider: Optional[Any] = None):
+    def __init__(self, ocr_engines: Dict[str, Any], llm_provider: Optional[Any] = None,
+                 cache: Optional[ResultCache] = None, config: Optional[Dict[str, Any]] = None,
+                 single_flight: Optional[SingleFlight] = None):
         self.ocr_engines = ocr_engines
         self.llm_provider = llm_provider
+        self.cache = cache
+        self.single_flight = single_flight or get_single_flight()
+        self.config = config or {}
+        self.block_concurrency = self.config.get('block_concurrency', 4)
+        self.page_concurrency = self.config.get('page_concurrency', 4)
+        self.pdf_dpi = self.config.get('pdf_dpi', 150)
+        self.batch_concurrency = self.config.get('batch_concurrency', 8)
+        self.router = ModeRouter(self.config.get('auto'))
+        self.layout_config = self.config.get('layout')
+    
+    def process_fast(self, source: ImageSource, use_cache: bool = True,
+                     on_event: Optional[EventCallback] = None) -> OCRResult:
+        return self._run('fast', source, self._process_fast, use_cache, on_event)
     
-    def process_fast(self, input_path: str) -> OCRResult:
+    def process_thinking(self, source: ImageSource, use_cache: bool = True,
+                         on_event: Optional[EventCallback] = None) -> OCRResult:
+        return self._run('thinking', source, self._process_thinking, use_cache, on_event)
+    
+    def process_auto(self, source: ImageSource, use_cache: bool = True,
+                     on_event: Optional[EventCallback] = None) -> OCRResult:
+        return self._run('auto', source, self._process_auto, use_cache, on_event)
+    
+    def process_batch(self, sources: List[ImageSource], mode: str = 'fast',
+                      use_cache: bool = True) -> List[Tuple[Optional[OCRResult], Optional[str]]]:
+        process = {
+            'thinking': self.process_thinking,
+            'auto': self.process_auto
+        }.get(mode, self.process_fast)
+        
+        def run(source: ImageSource) -> Tuple[Optional[OCRResult], Optional[str]]:
+            try:
+                return process(source, use_cache=use_cache), None
+            except Exception as e:
+                logger.error(f"Batch item {describe_source(source)} failed: {str(e)}")
+                return None, str(e)
+        
+        if not sources:
+            return []
+        
+        logger.info(f"Batch: {len(sources)} documents in {mode} mode")
+        max_workers = max(1, min(self.batch_concurrency, len(sources)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(run, sources))
+    
+    def _emit(self, on_event: Optional[EventCallback], event: str, data: Dict[str, Any]) -> None:
+        if on_event is None:
+            return
+        try:
+            on_event(event, data)
+        except Exception as e:
+            logger.warning(f"Event callback failed for '{event}': {str(e)}")
+    
+    def _timed(self, timer: StageTimer, stage: str, fn, *args, **kwargs):
+        with timer.stage(stage):
+            return fn(*args, **kwargs)
+    
+    def _emit_on_done(self, on_event: Optional[EventCallback], event: str):
+        def callback(future):
+            if future.exception() is None:
+                self._emit(on_event, event, {'text': future.result().text})
+        return callback
+    
+    def _run(self, mode: str, source: ImageSource, pipeline, use_cache: bool,
+             on_event: Optional[EventCallback] = None) -> OCRResult:
         start_time = time.time()
+        timer = StageTimer()
+        # Read, hash, decode and encode the input at most once per request
+        handle = ImageHandle(source)
+        
+        # Same key for the result cache and for joining identical in-flight requests
+        cache_key = self._cache_key(mode, handle)
+        result, tier, coalesced = None, None, False
+        
+        if self.cache and use_cache:
+            result, tier = self.cache.get(cache_key)
+            if result is not None:
+                self._emit(on_event, 'cache_hit', {'tier': tier})
         
+        if result is None:
+            def compute(emit: Optional[EventCallback]) -> OCRResult:
+                # Auto mode inspects PDFs itself before choosing a pipeline
+                if is_pdf(handle) and mode != 'auto':
+                    computed = self._process_pdf(mode, handle, emit, timer, use_cache)
+                else:
+                    computed = pipeline(handle, emit, timer, use_cache)
+                computed.metadata['metrics'] = timer.as_metadata()
+                return computed
+            
+            # A request that skips the caches must not join a run that may be answered from them
+            flight_key = cache_key if use_cache else f"{cache_key}:no-cache"
+            try:
+                result, coalesced = self.single_flight.do(flight_key, compute, on_event)
+            except Exception:
+                ERRORS.labels(stage='request').inc()
+                raise
+            
+            # Followers were released with the result above; only the leader writes the cache
+            if self.cache and not coalesced and not result.metadata.get('degraded'):
+                self.cache.put(cache_key, result)
+            
+            # Each caller gets its own metadata; the leader's stage metrics are kept
+            result = replace(result, metadata={**result.metadata, 'coalesced': coalesced})
+        
+        if self.cache:
+            stats = self.cache.stats()
+            result.metadata['cache'] = {
+                'hit': tier is not None,
+                'tier': tier,
+                'bypassed': not use_cache,
+                'hits': sum(stats['hits'].values()),
+                'misses': stats['misses']
+            }
+        
+        if not coalesced:
+            result.metadata['metrics'] = timer.as_metadata()
+        
+        execution_time = time.time() - start_time
+        REQUEST_SECONDS.labels(mode=mode).observe(execution_time)
+        log_ocr_run(mode, source, result, execution_time)
+        
+        return result
+    
+    def _cache_key(self, mode: str, handle: ImageHandle) -> str:
+        digest = handle.digest
+        
+        plugins = dict(self.ocr_engines)
+        if self.llm_provider:
+            plugins['llm'] = self.llm_provider
+        models = {
+            name: {
+                'model': getattr(plugin, 'model', None),
+                'version': plugin.version,
+                'preprocess': (getattr(plugin, 'config', None) or {}).get('preprocess')
+            }
+            for name, plugin in plugins.items()
+        }
+        
+        return ResultCache.make_key(digest, mode, models, PROMPT_VERSION)
+    
+    def _pdf_layout(self, source: ImageSource, timer: StageTimer) -> Optional[Dict[int, List[Dict[str, Any]]]]:
+        marker = self.ocr_engines.get('marker')
+        if not marker:
+            return None
+        
+        logger.info("Thinking mode: Step 1 - Marker layout detection")
+        with timer.stage('marker_layout'):
+            blocks = LayoutProcessor(marker).extract_layout_blocks(source)
+        
+        # Marker reports bboxes in PDF points; pages are rasterized at pdf_dpi
+        scale = self.pdf_dpi / POINTS_PER_INCH
+        pages: Dict[int, List[Dict[str, Any]]] = {}
+        for block in blocks:
+            scaled = dict(block, bbox=[round(v * scale) for v in block['bbox']])
+            pages.setdefault(block.get('page', 0), []).append(scaled)
+        return pages
+    
+    def _page_events(self, on_event: Optional[EventCallback], index: int) -> Optional[EventCallback]:
+        if on_event is None:
+            return None
+        return lambda event, data: on_event(event, {**data, 'page': index + 1})
+    
+    def _process_pdf(self, mode: str, source: ImageSource, on_event: Optional[EventCallback],
+                     timer: StageTimer, use_cache: bool = True) -> OCRResult:
+        with PdfPages(source, self.pdf_dpi) as pdf:
+            if not len(pdf):
+                raise ValueError("PDF has no pages")
+            return self._process_pdf_pages(mode, source, pdf, on_event, timer, use_cache)
+    
+    def _process_pdf_pages(self, mode: str, source: ImageSource, pdf: PdfPages,
+                           on_event: Optional[EventCallback], timer: StageTimer,
+                           use_cache: bool) -> OCRResult:
+        pipeline_steps = ['pdf-rasterize']
+        layout = None
+        if mode == 'thinking':
+            layout = self._pdf_layout(source, timer)
+            if layout is not None:
+                pipeline_steps.append('marker-layout')
+        
+        def run_page(index: int):
+            start = time.time()
+            page_on_event = self._page_events(on_event, index)
+            try:
+                # Pages are rendered as workers reach them, so at most page_concurrency are in memory
+                with timer.stage('pdf_rasterize'):
+                    page = ImageHandle(pdf.render(index))
+                if mode == 'thinking':
+                    page_blocks = layout.get(index, []) if layout is not None else None
+                    page_result = self._process_thinking(page, page_on_event, timer, use_cache,
+                                                         layout_blocks=page_blocks)
+                else:
+                    page_result = self._process_fast(page, page_on_event, timer, use_cache)
+                error = None
+                self._emit(on_event, 'page', {'page': index + 1, 'text': page_result.text})
+            except Exception as e:
+                logger.warning(f"Page {index + 1} failed: {str(e)}")
+                page_result, error = None, str(e)
+            return page_result, error, time.time() - start
+        
+        logger.info(f"PDF: processing {len(pdf)} pages in {mode} mode")
+        max_workers = max(1, min(self.page_concurrency, len(pdf)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(run_page, range(len(pdf))))
+        
+        succeeded = [page_result for page_result, _, _ in outcomes if page_result is not None]
+        if not succeeded:
+            raise RuntimeError(f"All {len(pdf)} PDF pages failed: {outcomes[0][1]}")
+        
+        page_metadata = []
+        texts = []
+        for index, (page_result, error, page_time) in enumerate(outcomes):
+            entry = {'page': index + 1, 'execution_time': round(page_time, 3)}
+            if page_result is None:
+                entry.update({'error': error, 'degraded': True})
+            else:
+                entry.update(page_result.metadata)
+                texts.append(page_result.text)
+                for step in page_result.metadata.get('pipeline', []):
+                    if step not in pipeline_steps:
+                        pipeline_steps.append(step)
+            page_metadata.append(entry)
+        
+        confidences = [page_result.confidence for page_result in succeeded]
+        
+        return OCRResult(
+            text='\n\n---\n\n'.join(texts),
+            boxes=[],
+            confidence=sum(confidences) / len(confidences),
+            metadata={
+                'mode': succeeded[0].metadata.get('mode', mode),
+                'pipeline': pipeline_steps,
+                'engine': succeeded[0].metadata.get('engine', 'unknown'),
+                'page_count': len(pdf),
+                'dpi': self.pdf_dpi,
+                'pages': page_metadata,
+                'degraded': any(entry.get('degraded') for entry in page_metadata)
+            }
+        )
+    
+    def _process_fast(self, source: ImageSource, on_event: Optional[EventCallback],
+                      timer: StageTimer, use_cache: bool = True,
+                      ocr_result: Optional[OCRResult] = None,
+                      speculative_visual: Optional[Future] = None) -> OCRResult:
         pipeline_steps = []
         
         glm_ocr = self.ocr_engines.get('glm-ocr')
@@ -58,37 +298,56 @@ class OCRProcessor:
         logger.info("Fast mode: Parallel execution - Step 1 (Visual) + Step 2 (OCR)")
         
         with ThreadPoolExecutor(max_workers=2) as executor:
-            future_visual = executor.submit(
-                self.llm_provider.detect_visual_elements,
-                input_path
-            )
+            # The auto router may have started the visual call alongside its first pass
+            if speculative_visual is None:
+                future_visual = self._submit_visual(executor, source, on_event, timer, use_cache)
             
-            future_ocr = executor.submit(
-                glm_ocr.process,
-                input_path,
-                task="text"
-            )
+            # A first pass already run by the auto router is reused as the OCR step
+            if ocr_result is None:
+                future_ocr = executor.submit(
+                    self._timed, timer, 'glm_ocr',
+                    glm_ocr.process,
+                    source,
+                    task="text"
+                )
+                future_ocr.add_done_callback(self._emit_on_done(on_event, 'ocr'))
             
-            visual_response = future_visual.result()
-            glm_result = future_ocr.result()
+            if speculative_visual is None:
+                visual_response = future_visual.result()
+            else:
+                visual_response = self._adopt_visual(speculative_visual, on_event, timer)
+            glm_result = future_ocr.result() if ocr_result is None else ocr_result
+        
+        timer.record_call(visual_response)
+        if ocr_result is None:
+            timer.record_call(glm_result)
         
         pipeline_steps.extend(['qwen3-vl-visual', 'glm-ocr'])
+        degraded = False
+        integration_metadata = {}
         
         logger.info("Fast mode: Step 3 - Integration (text-only)")
         try:
-            final_response = self.llm_provider.integrate_results_text_only(
-                visual_response.text,
-                glm_result.text
-            )
+            with timer.stage('integration'):
+                final_response = self.llm_provider.integrate_results_text_only(
+                    visual_response.text,
+                    glm_result.text,
+                    on_token=self._token_callback(on_event),
+                    use_cache=use_cache
+                )
+            timer.record_call(final_response)
             pipeline_steps.append('qwen3-vl-integration-text')
+            if final_response.metadata.get('map_reduce'):
+                integration_metadata['integration_map_reduce'] = final_response.metadata['map_reduce']
             ocr_text = final_response.text
             confidence = glm_result.confidence
         except Exception as e:
             logger.warning(f"Integration failed: {str(e)}, using GLM text only")
             ocr_text = glm_result.text
             confidence = glm_result.confidence
+            degraded = True
         
-        result = OCRResult(
+        return OCRResult(
             text=ocr_text,
             boxes=[],
             confidence=confidence,
@@ -96,69 +355,165 @@ class OCRProcessor:
                 'mode': 'fast-parallel',
                 'pipeline': pipeline_steps,
                 'engine': 'qwen3vl+glm-ocr',
-                'visual_elements': visual_response.text
+                'visual_elements': visual_response.text,
+                'degraded': degraded,
+                **integration_metadata
             }
         )
+    
+    def _submit_visual(self, executor: ThreadPoolExecutor, source: ImageSource,
+                       on_event: Optional[EventCallback], timer: StageTimer, use_cache: bool) -> Future:
+        future_visual = executor.submit(
+            self._timed, timer, 'visual',
+            self.llm_provider.detect_visual_elements,
+            source,
+            use_cache=use_cache
+        )
+        future_visual.add_done_callback(self._emit_on_done(on_event, 'visual'))
+        return future_visual
+    
+    def _speculate_visual(self, source: ImageSource, use_cache: bool) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        response = self.llm_provider.detect_visual_elements(source, use_cache=use_cache)
+        return response, time.perf_counter() - start
+    
+    def _adopt_visual(self, future: Future, on_event: Optional[EventCallback], timer: StageTimer) -> Any:
+        # A speculative call is only timed and reported once a fast route uses it
+        try:
+            response, seconds = future.result()
+        except Exception:
+            ERRORS.labels(stage='visual').inc()
+            raise
+        timer.observe('visual', seconds)
+        self._emit(on_event, 'visual', {'text': response.text})
+        return response
+    
+    def _process_auto(self, source: ImageHandle, on_event: Optional[EventCallback],
+                      timer: StageTimer, use_cache: bool = True) -> OCRResult:
+        glm_ocr = self.ocr_engines.get('glm-ocr')
+        if not glm_ocr:
+            raise ValueError("GLM-OCR engine required for auto mode")
         
-        execution_time = time.time() - start_time
-        log_ocr_run('fast', input_path, result, execution_time)
+        ocr_result = None
+        speculative_visual = None
+        if is_pdf(source):
+            with timer.stage('route'):
+                preview = rasterize_pdf(source, self.router.preview_dpi, max_pages=1)
+                signals = {'file_type': 'pdf', 'page_count': page_count(source)}
+                if preview:
+                    signals['edge_density'] = self.router.edge_density(preview[0])
+            decision = self.router.route_pdf(signals, 'marker' in self.ocr_engines)
+        else:
+            with timer.stage('route'):
+                signals = self.router.image_signals(source.decoded().image)
+            
+            # Fast mode's visual call does not depend on the route, so it runs while GLM reads the text.
+            # The executor is not waited on; a call left unused by a thinking route finishes on its own
+            # without being timed or reported.
+            if self.llm_provider and self.router.speculative_visual:
+                executor = ThreadPoolExecutor(max_workers=1)
+                speculative_visual = executor.submit(self._speculate_visual, source, use_cache)
+                executor.shutdown(wait=False)
+            
+            # The GLM first pass is both a routing signal and the OCR step of either pipeline
+            with timer.stage('glm_ocr'):
+                ocr_result = glm_ocr.process(source, task="text")
+            timer.record_call(ocr_result)
+            self._emit(on_event, 'ocr', {'text': ocr_result.text})
+            decision = self.router.route_image({**signals, **self.router.text_signals(ocr_result.text)})
         
+        logger.info(f"Auto mode: routed to {decision.mode} ({', '.join(decision.reasons)})")
+        self._emit(on_event, 'route', decision.as_metadata())
+        
+        if is_pdf(source):
+            result = self._process_pdf(decision.mode, source, on_event, timer, use_cache)
+        elif decision.mode == 'thinking':
+            result = self._process_thinking(source, on_event, timer, use_cache, ocr_result=ocr_result)
+        else:
+            result = self._process_fast(source, on_event, timer, use_cache, ocr_result=ocr_result,
+                                        speculative_visual=speculative_visual)
+        
+        result.metadata['routing'] = decision.as_metadata()
         return result
     
-    def process_thinking(self, input_path: str) -> OCRResult:
-        start_time = time.time()
-        
+    def _token_callback(self, on_event: Optional[EventCallback]) -> Optional[Callable[[str], None]]:
+        if on_event is None:
+            return None
+        return lambda token: self._emit(on_event, 'token', {'text': token})
+    
+    def _ocr_block(self, layout_proc: LayoutProcessor, glm_ocr: Any, image: Any,
+                   block: Dict[str, Any], on_event: Optional[EventCallback],
+                   timer: StageTimer) -> Optional[Dict[str, Any]]:
+        try:
+            cropped = layout_proc.crop_image_block(image, block['bbox'])
+            task = block.get('task', 'text')
+            with timer.stage('block_ocr'):
+                block_ocr = glm_ocr.process(cropped, task=task)
+            timer.record_call(block_ocr)
+            block_result = {
+                'block_id': block['id'],
+                'bbox': block['bbox'],
+                'type': block.get('type', 'text'),
+                'task': task,
+                'source_ids': block.get('source_ids', [block['id']]),
+                'text': block_ocr.text,
+                'confidence': block_ocr.confidence
+            }
+            self._emit(on_event, 'block', block_result)
+            return block_result
+        except Exception as e:
+            logger.warning(f"Block {block['id']} OCR failed: {str(e)}")
+            return None
+    
+    def _process_thinking(self, source: ImageSource, on_event: Optional[EventCallback],
+                          timer: StageTimer, use_cache: bool = True,
+                          layout_blocks: Optional[List[Dict[str, Any]]] = None,
+                          ocr_result: Optional[OCRResult] = None) -> OCRResult:
         pipeline_steps = []
+        degraded = False
         
-        marker = self.ocr_engines.get('marker')
         glm_ocr = self.ocr_engines.get('glm-ocr')
         
         if not glm_ocr:
             raise ValueError("GLM-OCR engine required for thinking mode")
         
-        blocks = []
+        blocks = layout_blocks or []
         block_results = []
         
-        file_ext = Path(input_path).suffix.lower()
-        is_pdf = file_ext == '.pdf'
+        if blocks:
+            layout_proc = LayoutProcessor(self.ocr_engines.get('marker'), self.layout_config)
+            image = layout_proc.load_image(source)
+            # Fragments are merged and tables/formulas get their own GLM task before any call is made
+            blocks = layout_proc.plan_blocks(blocks, image.size)
+            logger.info(f"Thinking mode: Step 2 - GLM-OCR processing {len(blocks)} blocks")
         
-        if marker and is_pdf:
-            logger.info("Thinking mode: Step 1 - Marker layout detection")
-            try:
-                layout_proc = LayoutProcessor(marker)
-                blocks = layout_proc.extract_layout_blocks(input_path)
-                pipeline_steps.append('marker-layout')
-                
-                if blocks:
-                    logger.info(f"Thinking mode: Step 2 - GLM-OCR processing {len(blocks)} blocks")
-                    
-                    for block in blocks:
-                        try:
-                            tmp_path = layout_proc.save_cropped_block(input_path, block['bbox'])
-                            try:
-                                block_ocr = glm_ocr.process(tmp_path, task="text")
-                                block_results.append({
-                                    'block_id': block['id'],
-                                    'bbox': block['bbox'],
-                                    'type': block.get('type', 'text'),
-                                    'text': block_ocr.text,
-                                    'confidence': block_ocr.confidence
-                                })
-                            finally:
-                                if os.path.exists(tmp_path):
-                                    os.unlink(tmp_path)
-                        except Exception as e:
-                            logger.warning(f"Block {block['id']} OCR failed: {str(e)}")
-                    
-                    pipeline_steps.append('glm-ocr-blocks')
-            except Exception as e:
-                logger.warning(f"Marker failed: {str(e)}, falling back to full image")
-        elif not is_pdf:
+        if blocks:
+            max_workers = max(1, min(self.block_concurrency, len(blocks)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                outcomes = list(executor.map(
+                    lambda block: self._ocr_block(layout_proc, glm_ocr, image, block, on_event, timer),
+                    blocks
+                ))
+            
+            for outcome in outcomes:
+                if outcome is None:
+                    degraded = True
+                else:
+                    block_results.append(outcome)
+            
+            pipeline_steps.append('glm-ocr-blocks')
+        elif layout_blocks is None:
             logger.info("Thinking mode: Skipping Marker (image file, not PDF)")
         
         if not block_results:
             logger.info("Thinking mode: Fallback - GLM-OCR full image")
-            glm_result = glm_ocr.process(input_path, task="text")
+            if ocr_result is None:
+                with timer.stage('glm_ocr'):
+                    glm_result = glm_ocr.process(source, task="text")
+                timer.record_call(glm_result)
+                self._emit(on_event, 'ocr', {'text': glm_result.text})
+            else:
+                glm_result = ocr_result
             pipeline_steps.append('glm-ocr-fallback')
             combined_text = glm_result.text
             combined_confidence = glm_result.confidence
@@ -167,19 +522,36 @@ class OCRProcessor:
             confidences = [b['confidence'] for b in block_results if b['confidence'] > 0]
             combined_confidence = sum(confidences) / len(confidences) if confidences else 0.0
         
+        structure_metadata = {}
         if self.llm_provider and hasattr(self.llm_provider, 'structure_blocks'):
             logger.info("Thinking mode: Step 3 - Qwen3VL structure analysis")
             try:
                 blocks_for_analysis = block_results if block_results else [{'id': 0, 'text': combined_text, 'type': 'full'}]
                 
-                qwen_response = self.llm_provider.structure_blocks(input_path, blocks_for_analysis)
+                with timer.stage('structure'):
+                    qwen_response = self.llm_provider.structure_blocks(
+                        source,
+                        blocks_for_analysis,
+                        on_token=self._token_callback(on_event),
+                        use_cache=use_cache
+                    )
                 pipeline_steps.append('qwen3-vl-structure')
                 combined_text = qwen_response.text
+                structure_metadata = {
+                    key: qwen_response.metadata[key] for key in ('pass2_prefill', 'pass2_map_reduce')
+                    if qwen_response.metadata.get(key) is not None
+                }
+                
+                timer.record_call(qwen_response)
+                for stage in ('pass1', 'pass2'):
+                    if f'{stage}_seconds' in qwen_response.metadata:
+                        timer.observe(stage, qwen_response.metadata[f'{stage}_seconds'])
                     
             except Exception as e:
                 logger.warning(f"Qwen3VL structuring failed: {str(e)}")
+                degraded = True
         
-        result = OCRResult(
+        return OCRResult(
             text=combined_text,
             boxes=[],
             confidence=combined_confidence,
@@ -187,12 +559,10 @@ class OCRProcessor:
                 'mode': 'thinking',
                 'pipeline': pipeline_steps,
                 'blocks_count': len(blocks),
+                'layout_blocks_count': len(layout_blocks or []),
                 'blocks': block_results,
-                'engine': 'layout-aware'
+                'engine': 'layout-aware',
+                'degraded': degraded,
+                **structure_metadata
             }
         )
-        
-        execution_time = time.time() - start_time
-        log_ocr_run('thinking', input_path, result, execution_time)
-        
-        return result
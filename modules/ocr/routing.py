@@ -0,0 +1,89 @@
+from dataclasses import dataclass, field
+from PIL import Image, ImageFilter
+from typing import Any, Dict, List, Optional
+import re
+
+NUMBER_PATTERN = re.compile(r'[-+]?\d+(?:[.,]\d+)?')
+TABLE_PATTERN = re.compile(r'<table|^\s*\|.*\|\s*$', re.IGNORECASE | re.MULTILINE)
+FORMULA_PATTERN = re.compile(r'\$\$|\\frac|\\sum|\\int|\\begin\{')
+
+
+@dataclass
+class RoutingDecision:
+    mode: str
+    reasons: List[str] = field(default_factory=list)
+    signals: Dict[str, Any] = field(default_factory=dict)
+    
+    def as_metadata(self) -> Dict[str, Any]:
+        return {'mode': self.mode, 'reasons': self.reasons, 'signals': self.signals}
+
+
+class ModeRouter:
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.edge_density_threshold = config.get('edge_density_threshold', 0.12)
+        self.min_text_lines = config.get('min_text_lines', 25)
+        self.numeric_ratio_threshold = config.get('numeric_ratio_threshold', 0.3)
+        self.min_numbers = config.get('min_numbers', 8)
+        self.max_thinking_pages = config.get('max_thinking_pages', 20)
+        self.sample_side = config.get('sample_side', 256)
+        self.preview_dpi = config.get('preview_dpi', 50)
+        self.speculative_visual = config.get('speculative_visual', False)
+    
+    def edge_density(self, image: Image.Image) -> float:
+        # Share of strong edges on a small grayscale copy; dense text and tables score high
+        sample = image.convert('L')
+        sample.thumbnail((self.sample_side, self.sample_side))
+        edges = sample.filter(ImageFilter.FIND_EDGES)
+        # The filter marks the image border, which would count as edges on a blank page
+        if edges.width > 2 and edges.height > 2:
+            edges = edges.crop((1, 1, edges.width - 1, edges.height - 1))
+        histogram = edges.histogram()
+        total = sum(histogram)
+        return round(sum(histogram[64:]) / total, 4) if total else 0.0
+    
+    def image_signals(self, image: Image.Image) -> Dict[str, Any]:
+        # Edge density only decides PDF routes; images are routed on their first-pass text
+        return {
+            'file_type': 'image',
+            'width': image.width,
+            'height': image.height
+        }
+    
+    def text_signals(self, text: str) -> Dict[str, Any]:
+        lines = [line for line in text.splitlines() if line.strip()]
+        tokens = text.split()
+        numbers = NUMBER_PATTERN.findall(text)
+        return {
+            'text_lines': len(lines),
+            'text_chars': len(text),
+            'numbers': len(numbers),
+            'numeric_ratio': round(len(numbers) / len(tokens), 3) if tokens else 0.0,
+            'has_table': bool(TABLE_PATTERN.search(text)),
+            'has_formula': bool(FORMULA_PATTERN.search(text))
+        }
+    
+    def route_image(self, signals: Dict[str, Any]) -> RoutingDecision:
+        # Photos are edge-heavy whatever their content, so images are routed on the first-pass text
+        reasons = []
+        if signals.get('has_table'):
+            reasons.append('table')
+        if signals.get('has_formula'):
+            reasons.append('formula')
+        if signals.get('text_lines', 0) >= self.min_text_lines:
+            reasons.append('long_text')
+        if (signals.get('numbers', 0) >= self.min_numbers and
+                signals.get('numeric_ratio', 0.0) >= self.numeric_ratio_threshold):
+            reasons.append('numeric_readings')
+        
+        return RoutingDecision('thinking' if reasons else 'fast', reasons or ['simple'], signals)
+    
+    def route_pdf(self, signals: Dict[str, Any], has_layout_engine: bool) -> RoutingDecision:
+        if not has_layout_engine:
+            return RoutingDecision('fast', ['no_layout_engine'], signals)
+        if signals['page_count'] > self.max_thinking_pages:
+            return RoutingDecision('fast', ['too_many_pages'], signals)
+        if signals.get('edge_density', 0.0) >= self.edge_density_threshold:
+            return RoutingDecision('thinking', ['dense_layout'], signals)
+        return RoutingDecision('fast', ['simple'], signals)
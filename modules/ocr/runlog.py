@@ -0,0 +1,184 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RunLogWriter:
+    
+    def __init__(self, directory: str = 'logs/ocr', max_segment_mb: float = 64,
+                 max_segment_age_seconds: float = 3600, compress: bool = True,
+                 retention_segments: int = 200, retention_days: float = 30,
+                 queue_size: int = 10000, flush_interval_seconds: float = 1.0):
+        self.directory = Path(directory)
+        self.max_segment_bytes = int(max_segment_mb * 1024 * 1024)
+        self.max_segment_age_seconds = max_segment_age_seconds
+        self.compress = compress
+        self.retention_segments = retention_segments
+        self.retention_days = retention_days
+        self.flush_interval_seconds = flush_interval_seconds
+        
+        self.dropped = 0
+        self._queue: 'queue.Queue[Optional[Dict[str, Any]]]' = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._segment_path: Optional[Path] = None
+        self._segment_opened_at = 0.0
+        self._segment_bytes = 0
+        self._sequence = 0
+        
+        self._thread = threading.Thread(target=self._loop, name="ocr-run-log", daemon=True)
+        self._thread.start()
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RunLogWriter':
+        return cls(
+            directory=config.get('directory', 'logs/ocr'),
+            max_segment_mb=config.get('max_segment_mb', 64),
+            max_segment_age_seconds=config.get('max_segment_age_seconds', 3600),
+            compress=config.get('compress', True),
+            retention_segments=config.get('retention_segments', 200),
+            retention_days=config.get('retention_days', 30),
+            queue_size=config.get('queue_size', 10000),
+            flush_interval_seconds=config.get('flush_interval_seconds', 1.0)
+        )
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"OCR run log queue full, {self.dropped} records dropped")
+    
+    def close(self) -> None:
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+    
+    def _loop(self) -> None:
+        running = True
+        while running:
+            batch: List[Dict[str, Any]] = []
+            try:
+                record = self._queue.get(timeout=self.flush_interval_seconds)
+                if record is None:
+                    running = False
+                else:
+                    batch.append(record)
+                
+                while running:
+                    record = self._queue.get_nowait()
+                    if record is None:
+                        running = False
+                    else:
+                        batch.append(record)
+            except queue.Empty:
+                pass
+            
+            try:
+                if batch:
+                    self._write_batch(batch)
+                elif self._segment and self._segment_expired():
+                    self._rotate()
+            except Exception as e:
+                logger.error(f"OCR run log write failed: {str(e)}")
+        
+        self._close_segment()
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        data = ''.join(
+            json.dumps(record, ensure_ascii=False, default=str) + '\n'
+            for record in batch
+        ).encode('utf-8')
+        
+        if self._segment and (self._segment_expired() or self._segment_bytes + len(data) > self.max_segment_bytes):
+            self._rotate()
+        
+        if self._segment is None:
+            self._open_segment()
+        
+        self._segment.write(data)
+        self._segment.flush()
+        self._segment_bytes += len(data)
+    
+    def _segment_expired(self) -> bool:
+        return time.time() - self._segment_opened_at > self.max_segment_age_seconds
+    
+    def _open_segment(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sequence += 1
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._segment_path = self.directory / f"runs_{timestamp}_{os.getpid()}_{self._sequence:04d}.jsonl"
+        self._segment = open(self._segment_path, 'ab')
+        self._segment_opened_at = time.time()
+        self._segment_bytes = 0
+    
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        
+        self._segment.close()
+        self._segment = None
+        
+        if self.compress and self._segment_path.exists():
+            compressed = self._segment_path.with_suffix('.jsonl.gz')
+            with open(self._segment_path, 'rb') as src, gzip.open(compressed, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            self._segment_path.unlink()
+    
+    def _rotate(self) -> None:
+        self._close_segment()
+        self._apply_retention()
+    
+    def _apply_retention(self) -> None:
+        segments = sorted(self.directory.glob('runs_*.jsonl*'), key=lambda p: p.stat().st_mtime)
+        cutoff = time.time() - self.retention_days * 86400
+        excess = len(segments) - self.retention_segments
+        
+        for index, path in enumerate(segments):
+            if index < excess or path.stat().st_mtime < cutoff:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to remove old run log {path}: {str(e)}")
+
+
+_writer: Optional[RunLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def configure_run_log(config: Dict[str, Any]) -> RunLogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = RunLogWriter.from_config(config)
+        return _writer
+
+
+def get_run_log() -> RunLogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = RunLogWriter()
+        return _writer
+
+
+def close_run_log() -> None:
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+
+
+atexit.register(close_run_log)
@@ -0,0 +1,82 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.metrics import COALESCED_REQUESTS
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class _Call:
+    
+    def __init__(self):
+        self.future: Future = Future()
+        self.subscribers: List[EventCallback] = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self, on_event: Optional[EventCallback]) -> None:
+        if on_event is not None:
+            with self._lock:
+                self.subscribers.append(on_event)
+    
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for on_event in subscribers:
+            try:
+                on_event(event, data)
+            except Exception as e:
+                logger.warning(f"Event callback failed for '{event}': {str(e)}")
+
+
+class SingleFlight:
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: str, fn: Callable[[Optional[EventCallback]], Any],
+           on_event: Optional[EventCallback] = None) -> Tuple[Any, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            call.subscribe(on_event)
+        
+        if not leader:
+            COALESCED_REQUESTS.inc()
+            logger.info(f"Joining in-flight computation {key[:12]}")
+            if on_event is not None:
+                on_event('coalesced', {'key': key})
+            return call.future.result(), True
+        
+        try:
+            # Events are only produced when the leader asked for them; they switch the model calls
+            # to streaming, which plain requests should not pay for. Followers of such a leader
+            # get the result without intermediate events.
+            result = fn(call.emit if on_event is not None else None)
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        else:
+            call.future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        
+        return result, False
+    
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight